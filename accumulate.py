@@ -0,0 +1,222 @@
+'''
+Sums and products of f(i) over i = m, ..., n.
+
+total() and product() are the engines behind sigma() and prod() in
+appendix1.py. total() tries, in order:
+
+    1. a closed form, if f is a polynomial (see polynomial.trace()): a
+       polynomial of degree d is summed from its first d + 1 values with
+       the Newton series sum(f(m + i), i < N) = sum(D^j f(m) * C(N, j + 1)),
+       which is what Faulhaber's formulas come to;
+    2. vectorized evaluation, calling f once per block of inputs on a NumPy
+       array (see tabulation.array_values());
+    3. a plain loop.
+
+Integer and Fraction terms are added exactly. Float terms are added with
+NumPy's pairwise summation inside a block and math.fsum across blocks, so
+the result does not depend on the block size. product() multiplies ints
+exactly as Python ints, never as int64.
+
+parallel_total() and parallel_product() split the range into chunks and
+reduce them across a process pool, for summands that can only be
+evaluated one index at a time.
+'''
+
+import functools
+import itertools
+import math
+import os
+
+from instrument import instrument
+from lazy import lazy_import
+from polynomial import trace
+from tabulation import array_values
+
+# Only the parallel reductions need a process pool.
+futures = lazy_import('concurrent.futures')
+
+# Number of inputs per vectorized call.
+BLOCK_SIZE = 1 << 20
+
+
+def total(f, m, n, args=(), vectorize=True, closed_form=True):
+    """Returns f(*args, m) + f(*args, m+1) + ... + f(*args, n).
+
+    Args:
+        f:           A function, called with args followed by the index.
+        m:           First index.
+        n:           Last index.
+        args:        Other arguments for f.
+        vectorize:   If true, try calling f on arrays of indices.
+        closed_form: If true, sum polynomial summands in closed form.
+    Returns:
+        The sum, 0 for an empty range.
+    """
+    if n < m:
+        return 0
+    f = instrument(f)
+    g = functools.partial(f, *args)
+    if closed_form:
+        p = trace(f, *args)
+        if p is not None and n - m > p.degree:
+            return _newton_sum([g(m + i) for i in range(p.degree + 1)],
+                               n - m + 1)
+    partials = _reduce_blocks(g, m, n, vectorize, sum_array, sum_values)
+    if any(isinstance(p, float) for p in partials):
+        return math.fsum(partials)
+    return sum(partials)
+
+
+def product(f, m, n, args=(), vectorize=True):
+    """Returns f(*args, m) * f(*args, m+1) * ... * f(*args, n).
+
+    Args:
+        f:         A function, called with args followed by the index.
+        m:         First index.
+        n:         Last index.
+        args:      Other arguments for f.
+        vectorize: If true, try calling f on arrays of indices.
+    Returns:
+        The product, 1 for an empty range.
+    """
+    if n < m:
+        return 1
+    g = functools.partial(instrument(f), *args)
+    return math.prod(_reduce_blocks(g, m, n, vectorize, _prod_array,
+                                    math.prod))
+
+
+def parallel_total(f, m, n, args=(), workers=None, chunk_size=None,
+                   progress=None):
+    """Like total(), but reduces chunks of the range in a process pool.
+
+    Each chunk is summed with total(), and the partial sums are combined in
+    chunk order -- with math.fsum if any is a float -- so the result is the
+    same however the chunks finish.
+
+    Args:
+        f:          A function, called with args followed by the index. It
+                    must be picklable, i.e. defined at module level.
+        m:          First index.
+        n:          Last index.
+        args:       Other arguments for f.
+        workers:    Number of worker processes. Defaults to the number of
+                    CPUs; 1 reduces the chunks in this process.
+        chunk_size: Indices per chunk. By default the range is split into
+                    four chunks per worker.
+        progress:   Optional function called as progress(done, chunks)
+                    after each chunk. If it returns False, the remaining
+                    chunks are cancelled.
+    Returns:
+        The sum.
+    Raises:
+        concurrent.futures.CancelledError: progress asked to stop.
+    """
+    partials = _parallel_reduce(total, f, m, n, args, workers, chunk_size,
+                                progress)
+    if any(isinstance(p, float) for p in partials):
+        return math.fsum(partials)
+    return sum(partials)
+
+
+def parallel_product(f, m, n, args=(), workers=None, chunk_size=None,
+                     progress=None):
+    """Like product(), but reduces chunks of the range in a process pool.
+
+    See parallel_total() for the arguments.
+    """
+    return math.prod(_parallel_reduce(product, f, m, n, args, workers,
+                                      chunk_size, progress))
+
+
+def _parallel_reduce(reduce, f, m, n, args, workers, chunk_size, progress):
+    # Returns the partial result of each chunk, in chunk order.
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if chunk_size is None:
+        chunk_size = max(1, -(-(n - m + 1) // (4 * workers)))
+    starts = range(m, n + 1, chunk_size)
+    chunks = [(lo, min(lo + chunk_size - 1, n)) for lo in starts]
+    partials = [None] * len(chunks)
+    if workers == 1:
+        for i, (lo, hi) in enumerate(chunks):
+            partials[i] = reduce(f, lo, hi, args)
+            if progress is not None and progress(i + 1, len(chunks)) is False:
+                raise futures.CancelledError()
+        return partials
+    with futures.ProcessPoolExecutor(workers) as pool:
+        pending = dict((pool.submit(reduce, f, lo, hi, tuple(args)), i)
+                       for i, (lo, hi) in enumerate(chunks))
+        done = 0
+        for future in futures.as_completed(pending):
+            partials[pending[future]] = future.result()
+            done += 1
+            if progress is not None and progress(done, len(chunks)) is False:
+                # Otherwise leaving the with block would wait for every
+                # chunk that has not started yet.
+                pool.shutdown(wait=False, cancel_futures=True)
+                raise futures.CancelledError()
+    return partials
+
+
+def _newton_sum(values, count):
+    # values are f(m), ..., f(m + d); reduce them to the leading D^j f(m).
+    leading = []
+    while values:
+        leading.append(values[0])
+        values = [b - a for a, b in zip(values, values[1:])]
+    result = 0
+    binomial = count                    # C(count, j + 1)
+    for j, d in enumerate(leading):
+        result += d * binomial
+        binomial = binomial * (count - j - 1) // (j + 2)
+    return result
+
+
+def _reduce_blocks(g, m, n, vectorize, reduce_array, reduce_scalar):
+    # Returns one partial result per block, in index order.
+    partials = []
+    start = m
+    while vectorize and start <= n:
+        xs = range(start, min(start + BLOCK_SIZE, n + 1))
+        values = array_values(g, xs)
+        if values is None:
+            break
+        partials.append(reduce_array(values))
+        start = xs.stop
+    if start <= n:
+        partials.append(reduce_scalar(map(g, range(start, n + 1))))
+    return partials
+
+
+def sum_values(values):
+    """Adds an iterable of terms: exactly unless the first is a float, in
+    which case with math.fsum."""
+    values = iter(values)
+    try:
+        first = next(values)
+    except StopIteration:
+        return 0
+    values = itertools.chain([first], values)
+    if isinstance(first, float):
+        return math.fsum(values)
+    return sum(values)
+
+
+def sum_array(values):
+    """Adds a 1-D ndarray of terms: pairwise for floats, and exactly for
+    integers even where the int64 sum would overflow."""
+    kind = values.dtype.kind
+    if kind in 'fc':
+        return values.sum().item()
+    if kind in 'iu':
+        bound = max(abs(int(values.min())), abs(int(values.max())))
+        if bound * len(values) < 2 ** 63:
+            return int(values.sum())
+    return sum(values.tolist())
+
+
+def _prod_array(values):
+    if values.dtype.kind in 'fc':
+        return values.prod().item()
+    return math.prod(values.tolist())
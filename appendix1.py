@@ -5,24 +5,54 @@
 # Python version of programs in Albert Cuoco's *Investigations in Algebra*
 # Appendix. Tools.
 
-import copy
+import collections
+import functools
 import sys
 import math
 import fractions
-import scipy
-import scipy.linalg
-if sys.version_info<(2,6,0):
-    try:
-        import Numeric as mathx
-    except ImportError:
-      sys.stderr.write("You need to install Numeric\n")
-      exit(1)
-else:
-    try:
-        import numpy as mathx
-    except ImportError:
-      sys.stderr.write("You need to install numpy\n")
-      exit(1)
+
+from lazy import lazy_import
+
+# NumPy is only needed by a few functions here, so it is imported the first
+# time one of them uses it rather than by `from appendix1 import *`.
+mathx = lazy_import('numpy')
+
+from tabulation import tabulate, column, function_name, write_text
+from tabulation import fits_int64
+from finite_differences import difference_table
+from accumulate import total, product, parallel_total, parallel_product
+from accumulate import sum_values, sum_array
+from combinatorics import binomial
+from intmath import factorial
+from iteration import cascade
+from composition import compose
+from golden import check, check_table, read_table
+from persistent import ConsList, Vector
+from flatten import flatten, flatten_list, flatten_array
+
+__all__ = [
+    'sys', 'math', 'fractions', 'mathx',
+    'test', 'check', 'check_table', 'read_table', 'cascade', 'compose',
+    'match', 'alt_tab', 'is_number', 'b', 'binomial', 'factorial',
+    'differences', 'print_matrix',
+    'emptyp', 'first', 'second', 'last', 'bf', 'but_first', 'bl',
+    'but_last', 'item', 'list_all', 'se', 'do_se', 'sentence', 'fput',
+    'lput', 'appl', 'setitem', 'ConsList', 'Vector', 'flatten',
+    'flatten_list', 'flatten_array',
+    'print_table', 'tab604', 'tab', 'tabv', 'tabc', 'rtab', 'tab2', 'tab3',
+    'simple_sigma', 'sigma', 'do_sigma', 'rsigma', 'do_rsigma', 'sigma_l',
+    'do_sigma_l', 'unique_combos', 'iter_unique_combos', 'combo_key',
+    'permutation_found', 'isa_permutation', 'prod', 'do_prod', 'one',
+    'ident',
+]
+
+def __getattr__(name):
+    # SciPy is used only in the differences() docstring example; it used to
+    # be imported here unconditionally. Load it on first access instead.
+    if name == 'scipy':
+        import scipy.linalg
+        return scipy
+    raise AttributeError("module %r has no attribute %r" % (__name__, name))
 
 ## ------------------------------------------------------
 ## APPENDIX
@@ -35,6 +65,7 @@ else:
 # ------------------------------------------------------------------------------
 # Simple provided test() function used in main() to print
 # what each function returns vs. what it's supposed to return.
+# To check whole tables of values at once, see golden.py.
 def test(got, expected):
   if match(got, expected):
     prefix = ' OK '
@@ -42,18 +73,10 @@ def test(got, expected):
     prefix = '  X '
   print('%s got: %s expected: %s' % (prefix, repr(got), repr(expected)))
 
-def cascade(n, f, *args):
-    result = args[0]
-    for i in range(n):
-        result = f(result)
-##    if len(args) > 1:
-##        handle other pairs of func, arg
-    return result
-
 def match(a, b, tolerance=0.0001):
-    if type(None) in [type(a), type(b)]:
+    if a is None or b is None:
         return a == b
-    if float in [type(a), type(b)]:
+    if type(a) is float or type(b) is float:
         return abs(a-b) < tolerance
     return a == b
 
@@ -70,15 +93,8 @@ def is_number(s):
         return False
 
 def b(n, k):
-    if k < 0 or k > n:
-        return 0
-    if k > n - k: # take advantage of symmetry
-        k = n - k
-    c = 1
-    for i in range(k):
-        c = c * (n - (k - (i+1)))
-        c = c // (i+1)
-    return c
+    """Returns the binomial coefficient C(n, k). See combinatorics.py."""
+    return binomial(n, k)
 
 """
 In the table below, n refers to the natural numbers, S(n) is the sum of n terms,
@@ -128,6 +144,7 @@ Substituting in n=1, n=2, n=3, and n=4, we get the following:
 
 To solve this system, use scipy.linalg:
 
+>>> import scipy, scipy.linalg
 >>> A = scipy.mat('[1 1 1 1; 8 4 2 1; 27 9 3 1; 64 16 4 1]')
 >>> b = scipy.mat('[2;8;20;40]')
 >>> scipy.linalg.solve(A,b)
@@ -146,31 +163,28 @@ def g119_closed(x):
 Finally, notice that the degree of the table is 3 with a constant difference of 2,
 a = 1/3, and 3! * (1/3) = 2
 
+finite_differences.fit() does all of this in one step. It finds the
+constant row itself and reads the coefficients off the first column of the
+table (Newton forward differences), so there is no system to solve:
+
+>>> fit([g119_recursive(n) for n in range(1, 11)], start=1, exact=True)
+(3, [Fraction(1, 3), Fraction(1, 1), Fraction(2, 3), Fraction(0, 1)])
+
 Reference:
     http://www.trans4mind.com/personal_development/mathematics/series/polynomialEquationDifferences.htm
 """
-def differences(function, start, end, deltas):
-    dmatrix = []
-    dmatrix.append(range(start,end+1))
-    m = map(function, range(start,end+1))
-    dmatrix.append(m)
-    for d in range(deltas):
-        dlist = []
-        for i in range(d+1):
-            dlist.append(0)
-        for i in range(d, len(m)-1):
-            dlist.append(m[i+1]-m[i])
-        m=dlist
-        dmatrix.append(dlist)
-    flist = str(function).split()
-    print( "function " + flist[1] + " from " + str(start) + " to " + str(end))
+def differences(function, start, end, deltas, vectorize=False):
+    values = list(column(function, range(start,end+1), vectorize))
+    table = difference_table(values, rows=deltas)
+    print("function " + function_name(function) + " from " + str(start) +
+          " to " + str(end))
     pretty_matrix = []
-    pretty_matrix.append(['n'] + dmatrix[0])
-    pretty_matrix.append(['S(n)'] + dmatrix[1])
-    i = 0
-    for dlist in dmatrix[2:]:
-        i += 1
-        pretty_matrix.append(['d' + str(i)] + dmatrix[i+1])
+    pretty_matrix.append(['n'] + list(range(start,end+1)))
+    pretty_matrix.append(['S(n)'] + values)
+    for i in range(1, deltas+1):
+        dlist = table[i].tolist() if i < len(table) else []
+        pretty_matrix.append(['d' + str(i)] +
+                             [0] * (len(values) - len(dlist)) + dlist)
     print_matrix(pretty_matrix)
 
 def print_matrix(m):
@@ -187,6 +201,8 @@ def print_matrix(m):
 ## ......................................................
 ## List Processing
 ## ......................................................
+## These work on lists and tuples, and on the persistent ConsList and
+## Vector from persistent.py, on which first() and bf() are O(1).
 
 def emptyp(l):
     return len(l) == 0
@@ -204,7 +220,7 @@ def bf(l):
     return l[1:]
 
 def but_first(l):
-    return bf(1)
+    return bf(l)
         
 def bl(l):
     return l[:-1]
@@ -219,15 +235,18 @@ def list_all(*args):
     return list(args)
 
 def se(*args):
-    return do_se(list(args))
+    return flatten_list(args)
 
 def do_se(l):
     """Flattens the list or tuple l. Helper function for se().
 
     Args:
-        l: A function name.
+        l: A list, tuple or other iterable.
     Returns:
-        Flattened list.
+        Flattened list: the lists, tuples, ConsLists and Vectors in l are
+        spliced in, one level deep. See flatten.flatten() for a lazy
+        version with a depth limit, and flatten.flatten_array() for NumPy
+        arrays.
     Note:
         There are a number of sequence types besides lists and tuples. These
         include str, unicode, bytearray, buffer, and xrange. An xrange is
@@ -235,21 +254,19 @@ def do_se(l):
         other sequence types won't be used in this course, so I'm not
         giving them any special treatment. --TJ
     """
-    s = []
-    for item in l:
-        if type(item) in [type([]), type(())]:
-            s += item
-        else:
-            s.append(item)
-    return s
+    return flatten_list(l)
 
 def sentence(l):
     return se(l)
 
 def fput(i,l):
+    if isinstance(l, (ConsList, Vector)):
+        return l.fput(i)
     return [i] + l
 
 def lput(i,l):
+    if isinstance(l, (ConsList, Vector)):
+        return l.lput(i)
     return l + [i]
 
 def appl(f, applist):
@@ -260,9 +277,11 @@ def appl(f, applist):
 
 def setitem(m, ob, l):
     assert m < len(l)
-    if type(ob) in [type([]), type(())]:
+    if type(ob) in (list, tuple):
         return l[:m] + ob + l[m+1:]
-    a=copy.deepcopy(l)
+    if isinstance(l, (ConsList, Vector)):
+        return l.setitem(m, ob)
+    a = l[:]
     a[m] = ob
     return a
 
@@ -275,26 +294,24 @@ def setitem(m, ob, l):
 
 ## p. 604 -----------------------------------------------
 
+def print_table(header, rows, file=None):
+    """Prints a header line, the rows of a table and a blank line.
+
+    Args:
+        header: First line of the table.
+        rows:   Rows from tabulation.tabulate().
+        file:   Open file to write to instead of standard output.
+    """
+    print(header, file=file)
+    write_text(rows, file)
+    print(file=file)
+
 def tab604(function, start, end):
-    flist = str(function).split()
-    print( "function " + flist[1] + " from " + str(start) + " to " + str(end))
-    for i in range(start,end+1):
-        print( str(i) + ". . ." + str(function(i)))
-    print()
+    print_table("function " + function_name(function) + " from " +
+                str(start) + " to " + str(end),
+                tabulate([function], start, end))
 
 def tab(function, start, end, *args, **keywords):
-    if 'step' in keywords.keys():
-        step = keywords['step']
-    else:
-        step=1
-    flist = str(function).split()
-    print("function " + flist[1] + " from " + str(start) + " to " + str(end))
-    arglist = list(args)
-    for i in range(start,end+1,step):
-        print( str(i) + ". . ." + str(function(*(arglist + [i]))))
-    print()
-
-##############def tab(function, start, end, *args, **keywords):
     """Creates a function table.
 
     Args:
@@ -306,6 +323,10 @@ def tab(function, start, end, *args, **keywords):
                   the last element is the smallest start + i * step greater
                   than stop. step must not be zero (or else ValueError is
                   raised).
+        file:     Open file to write the table to instead of printing it.
+        vectorize: If true, call the function once on a NumPy array of all
+                  the inputs when it supports that, instead of once per
+                  input. See tabulation.column().
         *args:    Other arguments for the function (if more than one is needed).
     Returns:
         None. Prints out table of inputs for a given function. Examples:
@@ -344,44 +365,37 @@ def tab(function, start, end, *args, **keywords):
     See below for a definition of f21()
     See chapter_06.py for a definition of geo_series158()
     See Appendix (page 605) for extended Logo version of tab()
+    See tabulation.py for writing tables as CSV or NumPy arrays
     """
-   ###### if 'step' in keywords.keys():
-        ######step = keywords['step']
-    ######else:
-       ############ step=1
-    ######flist = str(function).split()
-   ###### print("function " + flist[1] + " from " + str(start) + " to " + str(enda))
-   ###### arglist = list(args)
-   ###### for i in range(start,end+1,step):
-       ###### print( str(i) + ". . ." + str(function(*(arglist + [i]))))
-    ######print()
+    step = keywords.get('step', 1)
+    print_table("function " + function_name(function) + " from " +
+                str(start) + " to " + str(end),
+                tabulate([functools.partial(function, *args)], start, end,
+                         step, keywords.get('vectorize', False)),
+                keywords.get('file'))
 
 def tabv(function, start, end, *args, **keywords):
-    if 'step' in keywords.keys():
-        step = keywords['step']
-    else:
-        step=1
-    flist = str(function).split()
-    print( "function " + flist[1] + " from " + str(start) + " to " + str(enda))
-    arglist = list(args)
-    for i in range(start,end+1,step):
-        if function(*(arglist + [i])):
-            print( str(i) + ". . ." + str(function(*(arglist + [i]))))
-    print()
+    step = keywords.get('step', 1)
+    rows = tabulate([functools.partial(function, *args)], start, end, step)
+    print_table("function " + function_name(function) + " from " +
+                str(start) + " to " + str(end),
+                (row for row in rows if row[1]),
+                keywords.get('file'))
 
 def tabc(f1,f2, start, end, *args, **keywords):
-    if 'step' in keywords.keys():
-        step = keywords['step']
+    step = keywords.get('step', 1)
+    inner = functools.partial(f2, *args)
+    if keywords.get('vectorize', False):
+        # Fusing polynomial steps can change floats in the last bits, so
+        # only do it when arrays are asked for anyway.
+        chain = compose(f1, inner)
     else:
-        step=1
-    f1list = str(f1).split()
-    f2list = str(f2).split()
-    print( "composite of functions " + f1list[1] + " and " + f2list[1] + " from " + str(start) + " to " + str(enda))
-##    print "function " + f1list[1] + " from " + str(start) + " to " + str(end)
-    arglist = list(args)
-    for i in range(start,end+1,step):
-        print( str(i) + ". . ." + str(f1(f2(*(arglist + [i])))))
-    print()
+        chain = lambda x: f1(inner(x))
+    print_table("composite of functions " + function_name(f1) + " and " +
+                function_name(f2) + " from " + str(start) + " to " + str(end),
+                tabulate([chain], start, end, step,
+                         keywords.get('vectorize', False)),
+                keywords.get('file'))
 
 def rtab(function, start, end, *args, **keywords):
     """Creates a function table.
@@ -395,68 +409,48 @@ def rtab(function, start, end, *args, **keywords):
                   the last element is the smallest start + i * step greater
                   than stop. step must not be zero (or else ValueError is
                   raised).
+        file:     Open file to write the table to instead of printing it.
         *args:    Other arguments for the function (if more than one is needed).
                   Input is added to front of arglist instead of back as with tab.
     Returns:
         None. Prints out table of inputs for a given function.
 """
-    if 'step' in keywords.keys():
-        step = keywords['step']
-    else:
-        step=1
-    flist = str(function).split()
-    print( "function " + flist[1] + " from " + str(start) + " to " + str(enda))
-    arglist = list(args)
-    for i in range(start,end+1,step):
-        print(str(i) + ". . ." + str(function(*([i] + arglist))))
-    print()
+    step = keywords.get('step', 1)
+    print_table("function " + function_name(function) + " from " +
+                str(start) + " to " + str(end),
+                tabulate([lambda x: function(x, *args)], start, end, step),
+                keywords.get('file'))
 
 def tab2(f1, f2, start, end, step=1, **keywords):
-    f1_list = f2_list = []
-    if 'f1args' in keywords.keys():
-        f1_args = keywords['f1args']
-    if 'f2args' in keywords.keys():
-        f2_args = keywords['f2args']
-    f1list = str(f1).split()
-    f2list = str(f2).split()
-    header = "functions " + str(f1list[1])
+    f1_args = keywords.get('f1args', [])
+    f2_args = keywords.get('f2args', [])
+    header = "functions " + function_name(f1)
     header += "(" + str(f1_args) + ",)"
-    header += " and " + str(f2list[1])
+    header += " and " + function_name(f2)
     header += "(" + str(f2_args) + ",)"
     header += " from " + str(start) + " to " + str(end)
-    print(headear)
-    for i in range(start,end+1,step):
-        tabline = str(i) + ". . ." + str(f1(*(f1_args + [i])))
-        tabline += ". . ." + str(f2(*(f2_args + [i])))
-        print(tabline)
-    print()
+    print_table(header,
+                tabulate([functools.partial(f1, *f1_args),
+                          functools.partial(f2, *f2_args)], start, end, step),
+                keywords.get('file'))
 
 
 def tab3(f1, f2, f3, start, end, step=1, **keywords):
-    f1_list = f2_list = f3_list = []
-    if 'f1args' in keywords.keys():
-        f1_args = keywords['f1args']
-    if 'f2args' in keywords.keys():
-        f2_args = keywords['f2args']
-    if 'f3args' in keywords.keys():
-        f3_args = keywords['f3args']
-    f1list = str(f1).split()
-    f2list = str(f2).split()
-    f3list = str(f3).split()
-    header = "functions " + str(f1list[1])
+    f1_args = keywords.get('f1args', [])
+    f2_args = keywords.get('f2args', [])
+    f3_args = keywords.get('f3args', [])
+    header = "functions " + function_name(f1)
     header += "(" + str(f1_args) + ",)"
-    header += " and " + str(f2list[1])
+    header += " and " + function_name(f2)
     header += "(" + str(f2_args) + ",)"
-    header += " and " + str(f3list[1])
+    header += " and " + function_name(f3)
     header += "(" + str(f3_args) + ",)"
     header += " from " + str(start) + " to " + str(end)
-    print(header)
-    for i in range(start,end+1,step):
-        tabline = str(i) + ". . ." + str(f1(*(f1_args + [i])))
-        tabline += ". . ." + str(f2(*(f2_args + [i])))
-        tabline += ". . ." + str(f3(*(f3_args + [i])))
-        print( tabline)
-    print()
+    print_table(header,
+                tabulate([functools.partial(f1, *f1_args),
+                          functools.partial(f2, *f2_args),
+                          functools.partial(f3, *f3_args)], start, end, step),
+                keywords.get('file'))
     
     
 
@@ -467,73 +461,142 @@ def tab3(f1, f2, f3, start, end, step=1, **keywords):
 ## ......................................................
 
 def simple_sigma(f,m,n):
-    return sum(f(i) for i in range(m,n+1))
+    return total(f, m, n)
 
-def sigma(f,*args):
+def sigma(f,*args, **keywords):
     arglist = list(args)
-    return do_sigma(f,arglist[:-2], arglist[-2], arglist[-1])
+    return do_sigma(f,arglist[:-2], arglist[-2], arglist[-1], **keywords)
 
-def do_sigma(f,extra,m,n):
-    return sum(f(*(extra + [i])) for i in range(m,n+1))
+def do_sigma(f,extra,m,n,workers=1,progress=None):
+    """Sums f(*(extra + [i])) for i from m to n.
+
+    With workers other than 1, the range is split into chunks that are
+    summed in a process pool. With a progress callback, it is split into
+    chunks even for one worker, so that progress is reported and can
+    cancel the sum. See accumulate.total() and accumulate.parallel_total().
+    """
+    if workers != 1 or progress is not None:
+        return parallel_total(f, m, n, extra, workers, progress=progress)
+    return total(f, m, n, extra)
 
 def rsigma(f,*args):
     arglist = list(args)
     return do_rsigma(f,arglist[:-2], arglist[-2], arglist[-1])
 
-def do_rsigma(f,extra,a,b):
-    return sum(f(*([i] + extra)) for i in range(m,n+1))
+def do_rsigma(f,extra,m,n):
+    return total(lambda i: f(i, *extra), m, n)
 
 def sigma_l(f, *args):
     arglist = list(args)
     return do_sigma_l(f,arglist[:-1], arglist[-1])
 
 def do_sigma_l(f, extra, list_of_combs):
-    if len(list_of_combs) == 0:
-        return 0
-    x = appl(f, se(extra, len(list_of_combs[0])))
-    y = do_sigma_l(f, extra, list_of_combs[1:])
-    return x + y
+    """Sums f(*se(extra, comb)) over the combos in list_of_combs.
+
+    Args:
+        f:             A function name.
+        extra:         List of arguments passed to f before each combo.
+        list_of_combs: Any iterable of combos, e.g. a lazy
+                       itertools.combinations(); it is consumed once. A 2-D
+                       ndarray with one combo per row is summed with a
+                       single call f(*extra, column1, column2, ...) when f
+                       accepts arrays; integer results are used only if
+                       the same call on float64 columns agrees with them,
+                       and otherwise each row is summed as Python ints.
+    Returns:
+        The sum, 0 if there are no combos.
+    """
+    g = functools.partial(f, *extra)
+    if getattr(list_of_combs, 'ndim', None) == 2:
+        try:
+            values = g(*list_of_combs.T)
+        except Exception:
+            values = None
+        if (isinstance(values, mathx.ndarray) and
+                values.shape == (len(list_of_combs),) and
+                (values.dtype.kind not in 'iu' or
+                 _fits_int64_columns(g, list_of_combs, values))):
+            return sum_array(values)
+        # Rows of Python ints cannot overflow the way int64 can.
+        list_of_combs = list_of_combs.tolist()
+    return sum_values(g(*comb) if isinstance(comb, (list, tuple)) or
+                      getattr(comb, 'ndim', 0) == 1 else g(comb)
+                      for comb in list_of_combs)
+
+def _fits_int64_columns(g, list_of_combs, values):
+    # The overflow check of tabulation.array_values(), for several columns.
+    try:
+        with mathx.errstate(all='ignore'):
+            floats = g(*list_of_combs.astype(mathx.float64).T)
+    except Exception:
+        return False
+    return (isinstance(floats, mathx.ndarray) and
+            floats.shape == values.shape and fits_int64(values, floats))
 
 def unique_combos(combolist):
-    l = []
+    """Returns the combos in combolist that are not permutations of an
+    earlier one, keeping the first of each. See iter_unique_combos()."""
+    return list(iter_unique_combos(combolist))
+
+def iter_unique_combos(combolist):
+    """Yields each combo in combolist that is not a permutation of an
+    earlier one.
+
+    Each combo is reduced to a hashable multiset key (see combo_key()) and
+    looked up in a set, so the whole pass is O(n * k log k) for n combos
+    of length k. combolist may be any iterable, including a generator.
+    """
+    seen = set()
+    unhashable = []
     for item in combolist:
-        if not permutation_found(item, l):
-            l.append(item)
-    return l
+        key = combo_key(item)
+        try:
+            if key in seen:
+                continue
+            seen.add(key)
+        except TypeError:
+            # Combos of lists: fall back to a linear scan for these.
+            if key in unhashable:
+                continue
+            unhashable.append(key)
+        yield item
+
+def combo_key(combo):
+    """Returns a key that is equal for two combos exactly when one is a
+    permutation of the other: the sorted tuple of its items, or a frozenset
+    of (item, count) pairs if the items cannot be sorted."""
+    try:
+        return tuple(sorted(combo))
+    except TypeError:
+        return frozenset(collections.Counter(combo).items())
 
 def permutation_found(i,l):
+    key = combo_key(i)
     for item in l:
-        if isa_permutation(item,i):
+        if len(item) == len(i) and combo_key(item) == key:
             return True
     return False
     
 def isa_permutation(a,b):
     if len(a) != len(b):
         return False
-    for item in a:
-        if not item in b:
-            return False
-    return True
+    return combo_key(a) == combo_key(b)
 
-def prod(f,*args):
+def prod(f,*args, **keywords):
     arglist = list(args)
-    return do_prod(f,arglist[:-2], arglist[-2], arglist[-1])
+    return do_prod(f,arglist[:-2], arglist[-2], arglist[-1], **keywords)
 
-def do_prod(f,extra,m,n):
-    return mathx.prod(list(f(*(extra + [i])) for i in range(m,n+1)))
+def do_prod(f,extra,m,n,workers=1,progress=None):
+    """Multiplies f(*(extra + [i])) for i from m to n, exactly for ints.
+
+    workers and progress are as for do_sigma().
+    """
+    if workers != 1 or progress is not None:
+        return parallel_product(f, m, n, extra, workers, progress=progress)
+    return product(f, m, n, extra)
 
 def one(x):
     return 1
 
 def ident(x):
     return x
-
-def factorial(n):
-    if n == 0:
-        return 1
-    return n * factorial(n-1)
-
-def binomial(n,k):
-    return factorial(n) / (factorial(k)*factorial(n-k))
-
-
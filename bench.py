@@ -0,0 +1,171 @@
+#!/usr/bin/python
+'''
+Benchmark suite: solvers, tables, sums and products, combinatorics and the
+chapter_01 kernels, each at a few input sizes.
+
+    python bench.py                          # print calls per second
+    python bench.py --save baseline.json     # ... and store them
+    python bench.py --compare baseline.json  # fail on a regression
+    python bench.py -k sigma                 # only cases matching 'sigma'
+
+Each rate is the median of REPEAT timed runs, which is steadier from one
+run to the next than the best one, and the runs of all the cases are
+interleaved, so a slow spell of the machine is spread over every case
+instead of landing on one. --compare exits with status 1 if any
+case runs at less than (1 - threshold) times its baseline rate; the
+default threshold is 0.3, wide enough that rerunning an unchanged tree
+against its own baseline passes.
+Baselines depend on the machine and the Python build, so keep them out of
+the repository and compare only runs made on the same machine. Anything
+the benchmarked functions print is discarded.
+'''
+
+import argparse
+import contextlib
+import io
+import json
+import math
+import platform
+import statistics
+import sys
+import timeit
+
+import appendix1
+import chapter_01
+from root_bisection import root_bisection
+from root_newton import root_newton_method
+
+REPEAT = 9
+THRESHOLD = 0.3
+
+
+def _cubic(x):
+    return x * x * x - 2 * x - 5
+
+
+def _cubic_prime(x):
+    return 3 * x * x - 2
+
+
+def _square(x):
+    return x * x
+
+
+def _cases():
+    """Yields (name, size, function of no arguments) for every case."""
+    for tolerance in (1e-6, 1e-12):
+        yield ('root_bisection', tolerance,
+               lambda t=tolerance: root_bisection(_cubic, 2, 3, t))
+        yield ('root_newton_method', tolerance,
+               lambda t=tolerance: root_newton_method(_cubic, _cubic_prime,
+                                                      2.0, t, 100))
+    for n in (100, 10000):
+        yield ('tab', n, lambda n=n: appendix1.tab(_square, 1, n))
+        yield ('tab3', n, lambda n=n: appendix1.tab3(_square, math.sqrt,
+                                                     chapter_01.f34, 1, n))
+        yield ('differences', n,
+               lambda n=n: appendix1.differences(chapter_01.f34, 1, n, 3))
+    for n in (1000, 20000):
+        yield ('sigma', n, lambda n=n: appendix1.sigma(_square, 1, n))
+        yield ('prod', n, lambda n=n: appendix1.prod(lambda i: i, 1, n))
+    for n in (100, 10000):
+        combos = [[i % 7, i % 5, i % 3] for i in range(n)]
+        yield ('unique_combos', n,
+               lambda c=combos: appendix1.unique_combos(c))
+    for n in (50, 1000):
+        yield ('b', n, lambda n=n: _uncached_row(appendix1.b, n))
+        yield ('binomial', n,
+               lambda n=n: _uncached_row(appendix1.binomial, n))
+    for n in (100, 5000):
+        yield ('count_numbers', n, lambda n=n: _uncached(
+            chapter_01.count_numbers, n))
+        yield ('power30b', n, lambda n=n: chapter_01.power30b(3, n))
+        yield ('digit', n, lambda n=n: chapter_01.digit(3 ** n))
+
+
+def _uncached_row(function, n):
+    # b() and binomial() are memoized; time the computation, not the cache.
+    appendix1.binomial.cache_clear()
+    return [function(n, k) for k in range(n + 1)]
+
+
+def _uncached(function, n):
+    appendix1.factorial.cache_clear()
+    return function(n)
+
+
+def run(pattern=None):
+    """Returns {'name[size]': calls per second} for the matching cases.
+
+    Each case is timed once per round, for REPEAT rounds, and its rate is
+    the median over the rounds.
+    """
+    timers = {}
+    for name, size, function in _cases():
+        key = '%s[%s]' % (name, size)
+        if not pattern or pattern in key:
+            timers[key] = timeit.Timer(function)
+    numbers = {}
+    times = {key: [] for key in timers}
+    with contextlib.redirect_stdout(io.StringIO()):
+        for key, timer in timers.items():
+            numbers[key], elapsed = timer.autorange()
+            times[key].append(elapsed)
+        for i in range(REPEAT - 1):
+            for key, timer in timers.items():
+                times[key].append(timer.timeit(numbers[key]))
+    results = {}
+    for key in timers:
+        results[key] = numbers[key] / statistics.median(times[key])
+        print('%-28s %14.1f /s' % (key, results[key]))
+    return results
+
+
+def compare(results, baseline, threshold=THRESHOLD):
+    """Prints each case's rate relative to the baseline and returns the
+    keys of those that dropped by more than threshold."""
+    regressions = []
+    for key, rate in sorted(results.items()):
+        if key not in baseline:
+            continue
+        ratio = rate / baseline[key]
+        flag = ''
+        if ratio < 1 - threshold:
+            regressions.append(key)
+            flag = '  REGRESSION'
+        print('%-28s %6.2fx%s' % (key, ratio, flag))
+    return regressions
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='Run the benchmark suite.')
+    parser.add_argument('-k', dest='pattern',
+                        help='only run cases whose name contains this')
+    parser.add_argument('--save', metavar='FILE',
+                        help='write the results to FILE as JSON')
+    parser.add_argument('--compare', metavar='FILE',
+                        help='compare against a baseline saved with --save')
+    parser.add_argument('--threshold', type=float, default=THRESHOLD,
+                        help='allowed fractional slowdown (default %(default)s)')
+    options = parser.parse_args(argv[1:])
+
+    results = run(options.pattern)
+    if options.save:
+        with open(options.save, 'w') as f:
+            json.dump({'python': sys.version,
+                       'machine': platform.platform(),
+                       'results': results}, f, indent=2, sort_keys=True)
+    if options.compare:
+        with open(options.compare) as f:
+            baseline = json.load(f)['results']
+        print()
+        regressions = compare(results, baseline, options.threshold)
+        if regressions:
+            print('%d regression(s) past %.0f%%'
+                  % (len(regressions), options.threshold * 100))
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
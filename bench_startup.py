@@ -0,0 +1,53 @@
+#!/usr/bin/python
+'''
+Startup benchmark: how long does importing a module take?
+
+Runs a fresh interpreter with `python -X importtime -c "import <module>"`
+for each module, several times, and prints the best cumulative import time
+along with the slowest imports it pulled in:
+
+    python bench_startup.py                  # appendix1 and chapter_01
+    python bench_startup.py root_bisection   # any other modules
+'''
+
+import os
+import subprocess
+import sys
+
+REPEAT = 5
+SHOW = 5
+
+
+def import_times(module):
+    """Returns {imported module: cumulative microseconds} for one import."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import ' + module],
+        cwd=here, capture_output=True, text=True, check=True)
+    times = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        try:
+            cumulative = int(fields[1])
+        except ValueError:
+            continue                    # the column header
+        times.setdefault(fields[2].strip(), cumulative)
+    return times
+
+
+def main(argv):
+    for module in argv[1:] or ['appendix1', 'chapter_01']:
+        runs = [import_times(module) for i in range(REPEAT)]
+        best = min(runs, key=lambda times: times[module])
+        print('%s: %.1f ms (best of %d)'
+              % (module, best[module] / 1000.0, REPEAT))
+        others = sorted((t, name) for name, t in best.items()
+                        if name != module)
+        for t, name in others[::-1][:SHOW]:
+            print('    %8.1f ms  %s' % (t / 1000.0, name))
+
+
+if __name__ == '__main__':
+    main(sys.argv)
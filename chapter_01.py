@@ -8,6 +8,9 @@ except ImportError:
     sys.stderr.write(
         "You need appendix.py in the same directory as this file.\n")
     exit(1)
+from instrument import instrument
+from intmath import factorial, power
+import digits
 
 ## ======================================================
 ## I. FUNCTIONS
@@ -51,48 +54,46 @@ def area(length, width, height):
 ##  ------------------------------------------------
 
 ## EXAMPLE 4
+## The book's version subtracts 10 until n < 10:
+##
+##   def digit(n):
+##       if n < 10:
+##           return n
+##       return digit(n - 10)
+##
+## That is very inefficient for large numbers (and runs out of stack near
+## n = 10000). Why is units(), which uses n % 10, a big improvement?
+## Both now come from digits.py, which also handles whole arrays.
 def digit(n):
-    if n < 10:
-        return n
-    return digit(n - 10)
+    return digits.digit(n)
 
-## This example is very inefficient for large numbers.
-## Why is the following function a big improvement?
 def units(n):
-    if n < 10:
-        return n
-    return units(n % 10)
+    return digits.units(n)
 
 ##------------------------------------------------
+## The book defines the next few functions recursively:
+##
+##   count_numbers(n) = n * count_numbers(n - 1), count_numbers(1) = 1
+##   power30b(n, e) = n * power30b(n, e - 1),     power30b(n, 0) = 1
+##
+## That makes one call per unit, so count_numbers(5000) runs out of stack.
+## These versions give the same results using the factorial() and power()
+## kernels in intmath.py. factorial() itself comes from there too.
 def count_numbers(n):
-    if n == 1:
-        return 1
-    return n * count_numbers(n - 1)
-
-## ------------------------------------------------
-def factorial(n):
-    if n == 0:
-        return 1
-    return n * factorial(n-1)
+    return factorial(n)
 
 
 ## ------------------------------------------------
 def power3(e):
-    if e == 1:
-        return 3
-    return 3 * power3(e-1)
+    return power(3, e)
 
 ##  ------------------------------------------------
 def power30a(n, e):
-    if e == 1:
-        return n
-    return n * power30a(n, e-1)
+    return power(n, e)
 
 
 def power30b(n, e):
-    if e == 0:
-        return 1
-    return n * power30b(n, e-1)
+    return power(n, e)
 
 ##  ------------------------------------------------
 ## You need to implement rep_mult yourself!
@@ -139,7 +140,7 @@ def h35b(x):
 ## Notice that in Python, you don't have to use the APPLY trick that
 ## is used in Logo. You can just pass the function name directly.
 def composite(f, g, x):
-    return f(g(x))
+    return instrument(f)(instrument(g)(x))
 
 def celcius_to_newgrade(c):
     return composite(fahrenheit_to_newgrade, celsius_to_fahrenheit, c)
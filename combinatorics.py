@@ -0,0 +1,109 @@
+'''
+Binomial coefficients.
+
+Every path computes with exact integers, from one of two kernels:
+
+    binomial()         -- memoized C(n, k), from math.comb() via _choose()
+    binomial_row()     -- C(n, 0), ..., C(n, n) as an array, from the
+                          multiplicative recurrence in _row()
+    binomial_triangle()-- rows 0..n of Pascal's triangle as a 2-D array,
+                          each row from _row() as well
+    binomial_mod()     -- C(n, k) mod a prime p, by Lucas' theorem, with
+                          _choose() on the base-p digits
+
+appendix1.b() and appendix1.binomial() are built on binomial(). Running
+this module checks the two kernels against each other.
+'''
+
+import functools
+import math
+
+from lazy import lazy_import
+
+mathx = lazy_import('numpy')
+
+# Largest n for which every entry of row n fits in an int64.
+INT64_ROWS = 66
+
+
+def _choose(n, k):
+    if k < 0 or k > n:
+        return 0
+    if isinstance(n, float) or isinstance(k, float):
+        if n != int(n) or k != int(k):
+            raise ValueError("binomial() needs whole numbers")
+        return float(math.comb(int(n), int(k)))
+    return math.comb(n, k)
+
+
+@functools.lru_cache(maxsize=4096, typed=True)
+def binomial(n, k):
+    """Returns C(n, k) exactly, or 0 if k < 0 or k > n.
+
+    Whole floats such as 5.0 are accepted, as the book's b() did, and give
+    a float.
+    """
+    return _choose(n, k)
+
+
+def _row(n):
+    # C(n, j+1) = C(n, j) * (n - j) // (j + 1); the division is exact.
+    row = [1] * (n + 1)
+    for j in range(n // 2):
+        row[j + 1] = row[n - j - 1] = row[j] * (n - j) // (j + 1)
+    return row
+
+
+def _dtype(n):
+    return mathx.int64 if n <= INT64_ROWS else object
+
+
+def binomial_row(n):
+    """Returns row n of Pascal's triangle as a 1-D ndarray.
+
+    The array has dtype int64 while every entry fits (n <= INT64_ROWS) and
+    holds Python ints otherwise.
+    """
+    return mathx.array(_row(n), dtype=_dtype(n))
+
+
+def binomial_triangle(n):
+    """Returns rows 0..n of Pascal's triangle as an (n+1) x (n+1) ndarray.
+
+    Entry [i, j] is C(i, j), zero above the diagonal. Row i holds the same
+    values as binomial_row(i).
+    """
+    table = mathx.zeros((n + 1, n + 1), dtype=_dtype(n))
+    for i in range(n + 1):
+        table[i, :i + 1] = _row(i)
+    return table
+
+
+def binomial_mod(n, k, p):
+    """Returns C(n, k) mod p for a prime p, by Lucas' theorem.
+
+    C(n, k) is congruent to the product of C(n_i, k_i) over the base-p
+    digits n_i, k_i of n and k, so only coefficients with n_i < p are ever
+    computed, however large n is.
+    """
+    if k < 0 or k > n:
+        return 0
+    result = 1
+    while n or k:
+        n, n_i = divmod(n, p)
+        k, k_i = divmod(k, p)
+        result = result * _choose(n_i, k_i) % p
+        if result == 0:
+            break
+    return result
+
+
+if __name__ == '__main__':
+    # Every row, on both sides of INT64_ROWS, must match math.comb().
+    triangle = binomial_triangle(2 * INT64_ROWS)
+    for n in range(2 * INT64_ROWS + 1):
+        expected = [binomial(n, k) for k in range(n + 1)]
+        assert binomial_row(n).tolist() == expected, n
+        assert triangle[n, :n + 1].tolist() == expected, n
+        assert not triangle[n, n + 1:].any(), n
+    print('binomial_row() and binomial_triangle() agree with binomial()')
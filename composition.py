@@ -0,0 +1,137 @@
+'''
+Compiled compositions of functions.
+
+chapter_01.composite(f, g, x) and appendix1.tabc() call f(g(x)) one value
+at a time. compose(f, g, ...), which tabc(..., vectorize=True) uses,
+records the chain once and compiles it:
+
+    to_kelvin = compose(lambda c: c + 273.15, scale, shift)
+    to_kelvin(212)                    # 373.15
+    to_kelvin(mathx.array(readings))  # the whole array at once
+
+Each function is traced with polynomial.trace(). Runs of neighbouring
+polynomial steps -- shift and scale above are both affine -- are fused by
+composing the polynomials, so the chain above is evaluated as the single
+expression (5/9) * x + (273.15 - 160/9). Steps that are not polynomials
+(branches, math.sqrt, ...) are kept as ordinary calls between the fused
+runs. Fusing reorders floating-point operations, so results can differ from
+f(g(x)) in the last bits. Running this module checks a few chains that mix
+both kinds of step.
+'''
+
+import math
+
+from polynomial import MAX_DEGREE, trace
+
+
+class Composition(object):
+    """A compiled chain of functions of one variable.
+
+    Composition(f, g, h)(x) == f(g(h(x))). The stages attribute holds the
+    callables actually run, innermost first, and polynomial the fused
+    Polynomial when the whole chain is one.
+    """
+    __slots__ = ('functions', 'stages', 'polynomial', '_run')
+
+    def __init__(self, *functions):
+        flat = []
+        for f in functions:
+            if isinstance(f, Composition):
+                flat.extend(f.functions)
+            else:
+                flat.append(f)
+        self.functions = tuple(flat)
+        self.stages, self.polynomial = _compile(self.functions[::-1])
+        self._run = _chain(self.stages)
+
+    def __repr__(self):
+        return 'Composition(%s)' % ', '.join(
+            getattr(f, '__name__', repr(f)) for f in self.functions)
+
+    def __call__(self, x):
+        return self._run(x)
+
+    def then(self, f):
+        """Returns the composition that applies f after this one."""
+        return Composition(f, self)
+
+
+def compose(*functions):
+    """Returns the compiled composition of functions, outermost first.
+
+    compose(f, g)(x) is f(g(x)); x may be a number or an ndarray.
+    """
+    return Composition(*functions)
+
+
+def _compile(functions):
+    # functions are innermost first. Returns (stages, polynomial).
+    stages = []
+    run = None
+    for f in functions:
+        p = trace(f)
+        if p is None:
+            if run is not None:
+                stages.append(_evaluator(run))
+                run = None
+            stages.append(f)
+            continue
+        if run is None:
+            run = p
+        elif run.degree * p.degree > MAX_DEGREE:
+            stages.append(_evaluator(run))
+            run = p
+        else:
+            run = p(run)
+    if run is not None:
+        stages.append(_evaluator(run))
+    polynomial = run if len(stages) == 1 and run is not None else None
+    return stages, polynomial
+
+
+def _chain(stages):
+    if not stages:
+        return lambda x: x
+    if len(stages) == 1:
+        return stages[0]
+    def run(x):
+        for stage in stages:
+            x = stage(x)
+        return x
+    return run
+
+
+def _evaluator(p):
+    # Straight-line code for the common low degrees; Horner otherwise.
+    if p.degree == 0:
+        c = p.coeffs[0]
+        return lambda x: c + 0 * x
+    if p.degree == 1:
+        a, b = p.coeffs
+        if b == 0:
+            return lambda x: a * x
+        return lambda x: a * x + b
+    return p
+
+
+if __name__ == '__main__':
+    # Steps that are not polynomials must stay plain calls.
+    def shift(x):
+        return x - 32
+
+    def scale(x):
+        return (5.0 / 9) * x
+
+    def f(x):
+        return x * x + 3 * x - 2
+
+    def g(x):
+        return 2 * x + 1
+
+    squares = [n * n for n in range(10)]
+    assert compose(f, lambda i: squares[i])(3) == f(9)
+    assert compose(lambda x: x if x > 0 else -x, shift)(0) == 32
+    assert math.isclose(compose(math.sqrt, scale, shift)(212), 10.0)
+    assert compose(g, lambda c: {1: 5}[c], g)(0) == 11
+    assert compose(f, g)(4) == f(g(4))
+    print('compose() agrees with nested calls')
@@ -0,0 +1,96 @@
+'''
+Decimal digits of integers.
+
+units() and digit() replace the recursive versions in chapter_01.py with
+a single % operation. all_digits() splits big ints by divide and conquer:
+it divides by 10**(k * 2**i) and converts only small pieces to strings,
+so it is not limited to the 4300 digits that str() allows. The *_array
+functions work on whole NumPy integer arrays at once.
+'''
+
+from lazy import lazy_import
+
+mathx = lazy_import('numpy')
+
+# all_digits() converts pieces of this many digits with str().
+CHUNK_DIGITS = 256
+
+
+def units(n):
+    """Returns the units digit of n (numbers below 10 are returned as is)."""
+    if n < 10:
+        return n
+    return n % 10
+
+
+def digit(n):
+    """Subtracting 10 until n < 10, as the book's digit() does, leaves
+    exactly units(n)."""
+    return units(n)
+
+
+def all_digits(n):
+    """Returns the decimal digits of abs(n), most significant first."""
+    n = abs(n)
+    if n < 10 ** CHUNK_DIGITS:
+        return [int(c) for c in str(n)]
+    powers = [10 ** CHUNK_DIGITS]
+    while powers[-1] * powers[-1] <= n:
+        powers.append(powers[-1] * powers[-1])
+    pieces = []
+    _split(n, powers, len(powers) - 1, 0, pieces)
+    return [int(c) for c in ''.join(pieces)]
+
+
+def _split(n, powers, level, width, pieces):
+    # n < powers[level] ** 2; width is the number of digits to pad to, or
+    # 0 for the leading piece, which is not padded.
+    if level < 0:
+        pieces.append(str(n).zfill(width))
+        return
+    hi, lo = divmod(n, powers[level])
+    half = CHUNK_DIGITS << level
+    if width == 0 and hi == 0:
+        _split(lo, powers, level - 1, 0, pieces)
+        return
+    _split(hi, powers, level - 1, max(width - half, 0), pieces)
+    _split(lo, powers, level - 1, half, pieces)
+
+
+def digit_sum(n):
+    """Returns the sum of the decimal digits of abs(n)."""
+    return sum(all_digits(n))
+
+
+def units_array(a):
+    """units() applied to every element of an integer array."""
+    a = mathx.asarray(a)
+    return mathx.where(a < 10, a, a % 10)
+
+
+def digits_array(a, width=None):
+    """Returns the decimal digits of abs(a) for an integer array a.
+
+    Args:
+        a:     A 1-D integer array.
+        width: Number of digit columns. Defaults to the number of digits of
+               the largest element.
+    Returns:
+        A 2-D array with one row per element, most significant digit
+        first, padded on the left with zeros.
+    """
+    a = abs(mathx.asarray(a, dtype=mathx.int64))
+    if width is None:
+        width = len(str(int(a.max()))) if a.size else 1
+    powers = 10 ** mathx.arange(width - 1, -1, -1, dtype=mathx.int64)
+    return (a[:, None] // powers) % 10
+
+
+def digit_sum_array(a):
+    """digit_sum() applied to every element of an integer array."""
+    a = abs(mathx.asarray(a, dtype=mathx.int64))
+    total = mathx.zeros_like(a)
+    while a.any():
+        total += a % 10
+        a = a // 10
+    return total
@@ -0,0 +1,157 @@
+'''
+Forward-mode automatic differentiation with dual numbers.
+
+A dual number a + b*eps (with eps*eps = 0) carries a value and its
+derivative through ordinary arithmetic, so evaluating func(Dual(x, 1))
+gives both func(x) and func'(x) in one pass. The parts may be floats or
+NumPy arrays, so the same type serves the batched solvers.
+'''
+
+import math
+import sys
+
+
+def _lib(v):
+    """Returns numpy for ndarray operands and math for everything else."""
+    numpy = sys.modules.get('numpy')
+    if numpy is not None and isinstance(v, numpy.ndarray):
+        return numpy
+    return math
+
+
+class Dual(object):
+    __slots__ = ('real', 'dual')
+
+    # Make ndarray op Dual defer to the reflected Dual methods instead of
+    # building an object array of Duals.
+    __array_ufunc__ = None
+
+    def __init__(self, real, dual=0.0):
+        self.real = real
+        self.dual = dual
+
+    def __repr__(self):
+        return 'Dual(%r, %r)' % (self.real, self.dual)
+
+    def __add__(self, other):
+        if isinstance(other, Dual):
+            return Dual(self.real + other.real, self.dual + other.dual)
+        return Dual(self.real + other, self.dual)
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        if isinstance(other, Dual):
+            return Dual(self.real - other.real, self.dual - other.dual)
+        return Dual(self.real - other, self.dual)
+
+    def __rsub__(self, other):
+        return Dual(other - self.real, -self.dual)
+
+    def __mul__(self, other):
+        if isinstance(other, Dual):
+            return Dual(self.real * other.real,
+                        self.real * other.dual + self.dual * other.real)
+        return Dual(self.real * other, self.dual * other)
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, other):
+        if isinstance(other, Dual):
+            return Dual(self.real / other.real,
+                        (self.dual * other.real - self.real * other.dual)
+                        / (other.real * other.real))
+        return Dual(self.real / other, self.dual / other)
+
+    def __rtruediv__(self, other):
+        return Dual(other / self.real,
+                    -other * self.dual / (self.real * self.real))
+
+    def __pow__(self, other):
+        if isinstance(other, Dual):
+            return exp(other * log(self))
+        if other == 0:
+            return Dual(self.real ** 0, self.dual * 0)
+        return Dual(self.real ** other,
+                    other * self.real ** (other - 1) * self.dual)
+
+    def __rpow__(self, other):
+        value = other ** self.real
+        return Dual(value, value * _lib(self.real).log(other) * self.dual)
+
+    def __neg__(self):
+        return Dual(-self.real, -self.dual)
+
+    def __pos__(self):
+        return self
+
+    def __abs__(self):
+        if _lib(self.real) is math:
+            return self if self.real >= 0 else -self
+        sign = _lib(self.real).sign(self.real)
+        return Dual(abs(self.real), sign * self.dual)
+
+    # Comparisons look at the value only, so functions with branches such
+    # as absolute_value() still differentiate piecewise.
+    def __lt__(self, other):
+        return self.real < getattr(other, 'real', other)
+
+    def __le__(self, other):
+        return self.real <= getattr(other, 'real', other)
+
+    def __gt__(self, other):
+        return self.real > getattr(other, 'real', other)
+
+    def __ge__(self, other):
+        return self.real >= getattr(other, 'real', other)
+
+
+def exp(x):
+    if isinstance(x, Dual):
+        value = _lib(x.real).exp(x.real)
+        return Dual(value, value * x.dual)
+    return _lib(x).exp(x)
+
+
+def log(x):
+    if isinstance(x, Dual):
+        return Dual(_lib(x.real).log(x.real), x.dual / x.real)
+    return _lib(x).log(x)
+
+
+def sqrt(x):
+    if isinstance(x, Dual):
+        value = _lib(x.real).sqrt(x.real)
+        return Dual(value, x.dual / (2 * value))
+    return _lib(x).sqrt(x)
+
+
+def sin(x):
+    if isinstance(x, Dual):
+        lib = _lib(x.real)
+        return Dual(lib.sin(x.real), lib.cos(x.real) * x.dual)
+    return _lib(x).sin(x)
+
+
+def cos(x):
+    if isinstance(x, Dual):
+        lib = _lib(x.real)
+        return Dual(lib.cos(x.real), -lib.sin(x.real) * x.dual)
+    return _lib(x).cos(x)
+
+
+def evaluate(func, x, *args):
+    """Evaluates func and its derivative at x in a single call.
+
+    Args:
+        func:  A function built from arithmetic and the functions in this
+               module, called as func(x, *args).
+        x:     A number or an ndarray.
+        *args: Extra arguments for func. They are treated as constants.
+    Returns:
+        A tuple (func(x), derivative of func at x).
+    """
+    y = func(Dual(x, x * 0 + 1.0), *args)
+    if isinstance(y, Dual):
+        return y.real, y.dual
+    return y, x * 0.0
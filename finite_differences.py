@@ -0,0 +1,277 @@
+'''
+Finite difference tables and polynomial fitting by Newton forward
+differences.
+
+If a sequence S(start), S(start + step), ... comes from a polynomial of
+degree d, its d-th differences are constant. difference_table() builds the
+rows with numpy.diff, degree() finds the first constant row, and fit()
+turns the leading entry of each row into the polynomial's coefficients
+without setting up a Vandermonde system. See the docstring of
+appendix1.differences() for a worked example.
+
+fit_exact() and fit_batch() return exact Fraction coefficients, and
+closed_form() turns them back into a function, e.g. g119_closed.
+'''
+
+import fractions
+import math
+
+from lazy import lazy_import
+
+mathx = lazy_import('numpy')
+
+
+def _as_array(values, exact):
+    if exact:
+        # Python ints and Fractions in an object array keep numpy.diff exact.
+        return mathx.array([v if isinstance(v, (int, fractions.Fraction))
+                            else fractions.Fraction(v) for v in values],
+                           dtype=object)
+    return mathx.asarray(values)
+
+
+def _is_constant(row, exact, rtol):
+    if len(row) < 2:
+        return False
+    if exact or row.dtype.kind in 'iub':
+        return bool((row == row[0]).all())
+    return bool(mathx.allclose(row, row[0], rtol=rtol, atol=rtol))
+
+
+def difference_table(values, rows=None, exact=False, rtol=1e-9):
+    """Returns the rows of a difference table.
+
+    Args:
+        values: Sequence of values S(start), S(start + step), ...
+        rows:   Number of difference rows to compute. By default the table
+                stops at the first constant row with at least two entries.
+        exact:  If true, work with Python ints and fractions.Fraction
+                instead of machine numbers (floats are converted exactly).
+        rtol:   Tolerance for deciding that a float row is constant.
+    Returns:
+        A list [S, d1, d2, ...] of 1-D arrays; row k has len(values) - k
+        entries.
+    """
+    table = [_as_array(values, exact)]
+    while len(table[-1]) > 1:
+        if rows is None and _is_constant(table[-1], exact, rtol):
+            break
+        if rows is not None and len(table) > rows:
+            break
+        table.append(mathx.diff(table[-1]))
+    return table
+
+
+def degree(values, exact=False, rtol=1e-9):
+    """Returns the degree of the polynomial generating values.
+
+    Returns:
+        The index of the first difference row that is constant (0 for a
+        constant sequence), or None if no such row has two or more
+        entries, i.e. there are too few values to tell.
+    """
+    table = difference_table(values, exact=exact, rtol=rtol)
+    if not _is_constant(table[-1], exact, rtol):
+        return None
+    return len(table) - 1
+
+
+def newton_to_power(leading, start=1, step=1):
+    """Converts Newton forward-difference form to power-basis coefficients.
+
+    Args:
+        leading: The first entry of each difference row, [S(start), d1, d2,
+                 ...], so that S(start + t*step) = sum(leading[j] * C(t, j)).
+        start:   Input of the first value.
+        step:    Spacing of the inputs.
+    Returns:
+        Coefficients, highest power first (as numpy.polyval expects). They
+        are Fractions if leading, start and step are ints or Fractions.
+    """
+    if all(isinstance(v, int) for v in list(leading) + [start, step]):
+        return _newton_to_power_int(leading, start, step)
+    exact = all(isinstance(v, (int, fractions.Fraction))
+                for v in list(leading) + [start, step])
+    one = fractions.Fraction(1) if exact else 1.0
+    offset = start * one / step
+    coeffs = [0 * one]
+    basis = [one]                       # C(t, j) as a polynomial in x
+    for j, d in enumerate(leading):
+        if len(coeffs) < len(basis):
+            coeffs.append(0 * one)
+        coeffs = [c + d * b for c, b in zip(coeffs, basis)]
+        # C(t, j+1) = C(t, j) * (t - j) / (j + 1), t = x/step - start/step
+        a0 = -(offset + j) / (j + 1)
+        a1 = one / (step * (j + 1))
+        basis = ([a0 * basis[0]] +
+                 [a0 * basis[i] + a1 * basis[i - 1]
+                  for i in range(1, len(basis))] +
+                 [a1 * basis[-1]])
+    while len(coeffs) > 1 and coeffs[-1] == 0:
+        coeffs.pop()
+    return coeffs[::-1]
+
+
+def _newton_to_power_int(leading, start, step):
+    # Scale by den = d! * step**d so that every d!/j! * step**(d-j) *
+    # prod(x - start - i*step for i < j) term has integer coefficients, and
+    # divide only once at the end.
+    d = len(leading) - 1
+    den = math.factorial(d) * step ** d
+    coeffs = [0] * (d + 1)              # lowest power first
+    basis = [1]                         # prod(x - start - i*step, i < j)
+    for j, dj in enumerate(leading):
+        scale = dj * (math.factorial(d) // math.factorial(j)) * step ** (d - j)
+        for i, b in enumerate(basis):
+            coeffs[i] += scale * b
+        shift = -(start + j * step)
+        basis = ([shift * basis[0]] +
+                 [shift * basis[i] + basis[i - 1]
+                  for i in range(1, len(basis))] +
+                 [basis[-1]])
+    while len(coeffs) > 1 and coeffs[-1] == 0:
+        coeffs.pop()
+    return [fractions.Fraction(c, den) for c in reversed(coeffs)]
+
+
+def _exact_leading(values):
+    # Pure-Python exact differences; for the short sequences fit() usually
+    # sees this is much cheaper than going through object arrays.
+    row = [v if isinstance(v, (int, fractions.Fraction))
+           else fractions.Fraction(v) for v in values]
+    leading = []
+    while len(row) > 1:
+        leading.append(row[0])
+        if all(v == row[0] for v in row):
+            return leading
+        row = [b - a for a, b in zip(row, row[1:])]
+    return None
+
+
+def fit(values, start=1, step=1, exact=False, rtol=1e-9):
+    """Fits the polynomial that generates a sequence.
+
+    Args:
+        values: Sequence of values S(start), S(start + step), ...
+        start:  Input of the first value.
+        step:   Spacing of the inputs.
+        exact:  If true, fit with exact rational arithmetic.
+        rtol:   Tolerance for deciding that a float row is constant.
+    Returns:
+        A tuple (degree, coefficients), coefficients highest power first.
+    Raises:
+        ValueError: No constant difference row was found.
+    """
+    if exact:
+        leading = _exact_leading(values)
+    else:
+        table = difference_table(values, rtol=rtol)
+        leading = None
+        if _is_constant(table[-1], exact, rtol):
+            leading = [float(row[0]) for row in table]
+    if leading is None:
+        raise ValueError("No constant difference row; need more values")
+    coeffs = newton_to_power(leading, start, step)
+    return len(coeffs) - 1, coeffs
+
+
+def fit_exact(data, start=1, end=None, step=1):
+    """Fits a polynomial exactly to a sequence or to a function on a range.
+
+    Args:
+        data:  A sequence of int or Fraction values S(start), S(start +
+               step), ..., or a function, in which case it is evaluated on
+               range(start, end + 1, step).
+        start: Input of the first value.
+        end:   Last input, when data is a function.
+        step:  Spacing of the inputs.
+    Returns:
+        A tuple (degree, coefficients) with Fraction coefficients, highest
+        power first.
+    Raises:
+        ValueError: No constant difference row was found.
+    """
+    if callable(data):
+        data = [data(x) for x in range(start, end + 1, step)]
+    return fit(data, start, step, exact=True)
+
+
+def fit_batch(sequences, start=1, step=1):
+    """Fits exact polynomials to many integer sequences at once.
+
+    When every sequence has the same length and the values are small enough
+    for int64 difference rows to be exact, all the difference tables are
+    built in one 2-D numpy.diff pass. Other batches are fitted one sequence
+    at a time.
+
+    Args:
+        sequences: An iterable of sequences of values.
+        start:     Input of the first value of every sequence.
+        step:      Spacing of the inputs.
+    Returns:
+        A list with a (degree, coefficients) tuple, or None when no constant
+        row was found, for each sequence.
+    """
+    sequences = [list(s) for s in sequences]
+    if not sequences:
+        return []
+    lengths = set(len(s) for s in sequences)
+    ints = all(isinstance(v, int) for s in sequences for v in s)
+    if len(lengths) != 1 or not ints:
+        return [_fit_or_none(s, start, step) for s in sequences]
+    n = lengths.pop()
+    # Row k of the table is bounded by 2**k * max(abs(values)).
+    if n == 0 or max(abs(v) for s in sequences for v in s) >= 2 ** (62 - n):
+        return [_fit_or_none(s, start, step) for s in sequences]
+    rows = [mathx.array(sequences, dtype=mathx.int64)]
+    while rows[-1].shape[1] > 1:
+        rows.append(mathx.diff(rows[-1], axis=1))
+    found = mathx.full(len(sequences), -1)
+    for k, row in enumerate(rows):
+        if row.shape[1] < 2:
+            break
+        constant = (row == row[:, :1]).all(axis=1) & (found < 0)
+        found[constant] = k
+    results = []
+    for i, d in enumerate(found.tolist()):
+        if d < 0:
+            results.append(None)
+            continue
+        leading = [int(rows[k][i, 0]) for k in range(d + 1)]
+        coeffs = newton_to_power(leading, start, step)
+        results.append((len(coeffs) - 1, coeffs))
+    return results
+
+
+def _fit_or_none(values, start, step):
+    try:
+        return fit(values, start, step, exact=True)
+    except ValueError:
+        return None
+
+
+def closed_form(coefficients):
+    """Returns a function that evaluates a polynomial exactly.
+
+    Args:
+        coefficients: Coefficients, highest power first, as from fit_exact().
+    Returns:
+        A function of one variable. For int inputs it returns an int when
+        the value is a whole number and a Fraction otherwise.
+    """
+    coefficients = [fractions.Fraction(c) for c in coefficients]
+    den = 1
+    for c in coefficients:
+        den = den * c.denominator // math.gcd(den, c.denominator)
+    numerators = [int(c * den) for c in coefficients]
+
+    def polynomial(x):
+        total = 0
+        for c in numerators:
+            total = total * x + c
+        value = fractions.Fraction(total, den) if isinstance(
+            total, int) else total / den
+        if isinstance(value, fractions.Fraction) and value.denominator == 1:
+            return value.numerator
+        return value
+    return polynomial
@@ -0,0 +1,113 @@
+'''
+Flattening nested sequences: the engine behind appendix1.se().
+
+flatten() is lazy. It splices the items of every list, tuple, etc. into the
+output stream, down to a given depth, without building intermediate
+lists:
+
+    >>> list(flatten([1, [2, [3]], (4,)]))
+    [1, 2, [3], 4]
+    >>> list(flatten([1, [2, [3]], (4,)], depth=None))
+    [1, 2, 3, 4]
+
+Lists and tuples are flattened, as do_se() always did, and so are the
+persistent ConsList and Vector from persistent.py; strings, ndarrays and
+other sequences are single items. flatten_list() returns a
+list, with a single-pass loop for the usual depth 1. flatten_array() is the
+array version: it concatenates ndarrays and numbers into one 1-D array,
+joining any ndarrays directly instead of iterating over them.
+'''
+
+from lazy import lazy_import
+from persistent import ConsList, Vector
+
+mathx = lazy_import('numpy')
+
+SEQUENCES = (list, tuple, ConsList, Vector)
+
+
+def flatten(items, depth=1):
+    """Yields the items of items, splicing in nested lists and tuples.
+
+    Args:
+        items: Any iterable.
+        depth: How many levels of nesting to remove: 1 (the default)
+               splices in the lists and tuples among items but leaves any
+               inside them alone, and None removes all nesting.
+    Returns:
+        An iterator over the flattened items.
+    """
+    if depth == 0:
+        return iter(items)
+    return _flatten(items, depth)
+
+
+def flatten_list(items, depth=1):
+    """Returns list(flatten(items, depth)), built without a generator
+    when depth is 1."""
+    if depth != 1:
+        return list(flatten(items, depth))
+    result = []
+    append = result.append
+    extend = result.extend
+    for x in items:
+        kind = type(x)
+        if (kind is list or kind is tuple or kind is ConsList or
+                kind is Vector):
+            extend(x)
+        else:
+            append(x)
+    return result
+
+
+def _flatten(items, depth):
+    # Splices in the sequences among items, flattening depth - 1
+    # more levels inside each.
+    for x in items:
+        if type(x) in SEQUENCES:
+            if depth is None:
+                yield from _flatten(x, None)
+            elif depth == 1:
+                yield from x
+            else:
+                yield from _flatten(x, depth - 1)
+        else:
+            yield x
+
+
+def flatten_array(items, depth=None):
+    """Returns items flattened into one 1-D ndarray.
+
+    ndarrays among items are raveled and concatenated as they are; lists
+    and tuples are flattened down to depth as for flatten(), and runs of
+    other items become arrays of their own. Unlike flatten(), depth
+    defaults to None, removing all nesting.
+
+    Raises:
+        ValueError: a list or tuple is nested deeper than depth, so it
+                    cannot be placed in a 1-D array.
+    """
+    pieces = []
+    run = []
+    for x in items:
+        if isinstance(x, mathx.ndarray):
+            piece = x.ravel()
+        elif type(x) in SEQUENCES and depth != 0:
+            piece = flatten_array(x, None if depth is None else depth - 1)
+        elif type(x) in SEQUENCES:
+            raise ValueError('flatten_array(): %r is nested more than '
+                             'depth levels deep' % (x,))
+        else:
+            run.append(x)
+            continue
+        if run:
+            pieces.append(mathx.array(run))
+            run = []
+        pieces.append(piece)
+    if run:
+        pieces.append(mathx.array(run))
+    if not pieces:
+        return mathx.array([])
+    if len(pieces) == 1:
+        return pieces[0]
+    return mathx.concatenate(pieces)
@@ -0,0 +1,249 @@
+'''
+Checking computed values against golden tables in bulk.
+
+appendix1.test() compares one pair of values and prints a line for it.
+check() compares whole arrays at once and returns a Report, which lists
+only the mismatches:
+
+    >>> report = check_table(geo_series158, read_table(text), 2, 3)
+    >>> print(report)
+    checked 20 values: all OK
+
+Floats match when |got - expected| <= atol + rtol * |expected|; the
+defaults, rtol=0 and atol=0.0001, are the tolerance match() uses. Ints,
+Fractions and other values must be equal. Large tables can be split into
+shards that are evaluated and checked in a process pool.
+'''
+
+import fractions
+import functools
+import itertools
+import os
+
+from lazy import lazy_import
+from tabulation import array_values
+
+mathx = lazy_import('numpy')
+# Only check_table() with several workers needs a process pool.
+futures = lazy_import('concurrent.futures')
+
+RTOL = 0.0
+ATOL = 0.0001
+
+# Number of mismatches str(Report) lists.
+SHOW = 10
+
+
+class Report(object):
+    """The result of a check.
+
+    Attributes:
+        checked:  Number of values compared.
+        indices:  Positions of the mismatches, in increasing order.
+        inputs:   The inputs at those positions, or None if not known.
+        got:      The computed values there.
+        expected: The golden values there.
+    """
+
+    def __init__(self, checked, indices, got, expected, inputs=None):
+        self.checked = checked
+        self.indices = list(indices)
+        self.got = list(got)
+        self.expected = list(expected)
+        self.inputs = None if inputs is None else list(inputs)
+
+    @property
+    def ok(self):
+        return not self.indices
+
+    def __len__(self):
+        return len(self.indices)
+
+    def __repr__(self):
+        return '<Report checked=%d mismatches=%d>' % (self.checked,
+                                                      len(self))
+
+    def __str__(self):
+        if self.ok:
+            return 'checked %d values: all OK' % self.checked
+        lines = ['checked %d values: %d mismatch%s'
+                 % (self.checked, len(self), '' if len(self) == 1 else 'es')]
+        labels = self.inputs if self.inputs is not None else self.indices
+        for label, got, expected in list(zip(labels, self.got,
+                                             self.expected))[:SHOW]:
+            lines.append('  X  %s: got: %r expected: %r'
+                         % (label, got, expected))
+        if len(self) > SHOW:
+            lines.append('  ... and %d more' % (len(self) - SHOW))
+        return '\n'.join(lines)
+
+    @classmethod
+    def combine(cls, reports):
+        """Joins the reports of consecutive shards into one."""
+        checked = 0
+        indices, got, expected, inputs = [], [], [], []
+        for report in reports:
+            indices.extend(i + checked for i in report.indices)
+            got.extend(report.got)
+            expected.extend(report.expected)
+            inputs.extend(report.inputs or [])
+            checked += report.checked
+        return cls(checked, indices, got, expected,
+                   inputs if len(inputs) == len(indices) else None)
+
+
+def matches(got, expected, rtol=RTOL, atol=ATOL):
+    """Returns a boolean array, true where got matches expected.
+
+    Float and complex arrays are compared in one vectorized isclose(), with
+    nan matching nan. Object arrays, e.g. of big ints or Fractions, are
+    compared element by element by the same rule.
+    """
+    got = mathx.asarray(got)
+    expected = mathx.asarray(expected)
+    if got.shape != expected.shape:
+        raise ValueError('cannot compare shapes %s and %s'
+                         % (got.shape, expected.shape))
+    if got.dtype == object or expected.dtype == object:
+        return mathx.fromiter(
+            (_match(a, b, rtol, atol) for a, b in
+             zip(got.ravel().tolist(), expected.ravel().tolist())),
+            dtype=bool, count=got.size).reshape(got.shape)
+    if got.dtype.kind in 'fc' or expected.dtype.kind in 'fc':
+        return mathx.isclose(got, expected, rtol=rtol, atol=atol,
+                             equal_nan=True)
+    return got == expected
+
+
+def _match(a, b, rtol, atol):
+    if isinstance(a, (float, complex)) or isinstance(b, (float, complex)):
+        try:
+            return a == b or abs(a - b) <= atol + rtol * abs(b) or (
+                a != a and b != b)
+        except TypeError:
+            return False
+    return a == b
+
+
+def check(got, expected, rtol=RTOL, atol=ATOL, inputs=None):
+    """Compares got with expected and returns a Report of the mismatches.
+
+    Args:
+        got:      Computed values, any array-like.
+        expected: Golden values of the same shape.
+        rtol:     Relative tolerance for floats.
+        atol:     Absolute tolerance for floats.
+        inputs:   Optional inputs the values were computed from, used to
+                  label the mismatches.
+    """
+    got = mathx.asarray(got)
+    expected = mathx.asarray(expected)
+    ok = matches(got, expected, rtol, atol).ravel()
+    bad = mathx.flatnonzero(~ok)
+    return Report(ok.size, bad.tolist(), got.ravel()[bad].tolist(),
+                  expected.ravel()[bad].tolist(),
+                  None if inputs is None
+                  else mathx.asarray(inputs).ravel()[bad].tolist())
+
+
+def read_table(lines, sep='. . .'):
+    """Reads a table in the layout tab() prints.
+
+    Lines without sep, such as the "function f from 1 to 5" header, are
+    skipped. Numbers are read as ints when possible, else as floats, else
+    as Fractions ("1/3").
+
+    Args:
+        lines: A string, or any iterable of lines such as an open file.
+        sep:   The column separator.
+    Returns:
+        A list of (x, f(x)) rows.
+    """
+    if isinstance(lines, str):
+        lines = lines.splitlines()
+    rows = []
+    for line in lines:
+        if sep not in line:
+            continue
+        x, value = line.strip().split(sep, 1)
+        rows.append((_number(x), _number(value)))
+    return rows
+
+
+def _number(text):
+    text = text.strip()
+    for kind in (int, float, fractions.Fraction):
+        try:
+            return kind(text)
+        except ValueError:
+            pass
+    return text
+
+
+def check_table(function, rows, *args, **keywords):
+    """Evaluates function at the inputs of a golden table and checks it.
+
+    Args:
+        function:   The function tabulated, called as function(*args, x).
+        rows:       Golden (x, f(x)) rows, e.g. from read_table().
+        *args:      Other arguments for the function, as for tab().
+        rtol, atol: Tolerances, as for check().
+        vectorize:  If true, call function once per shard on an array of
+                    the inputs when tabulation.array_values() accepts the
+                    result, which rules out int64 overflow.
+        workers:    Number of worker processes; 1 (the default) checks
+                    everything in this process. With more, function must
+                    be picklable, i.e. defined at module level.
+        chunk_size: Rows per shard. By default the rows are split into four
+                    shards per worker.
+    Returns:
+        A Report of the mismatches, labelled with their inputs.
+    """
+    rtol = keywords.get('rtol', RTOL)
+    atol = keywords.get('atol', ATOL)
+    vectorize = keywords.get('vectorize', False)
+    workers = keywords.get('workers', 1)
+    chunk_size = keywords.get('chunk_size')
+    rows = list(rows)
+    xs = [row[0] for row in rows]
+    expected = [row[1] for row in rows]
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if chunk_size is None:
+        chunk_size = max(1, -(-len(rows) // (4 * workers)))
+    starts = range(0, len(rows), chunk_size)
+    shards = ([xs[i:i + chunk_size] for i in starts],
+              [expected[i:i + chunk_size] for i in starts])
+    common = [itertools.repeat(value) for value in
+              (function, args, rtol, atol, vectorize)]
+    if workers == 1 or len(starts) <= 1:
+        reports = list(map(_check_shard, *(common + list(shards))))
+    else:
+        with futures.ProcessPoolExecutor(workers) as pool:
+            reports = list(pool.map(_check_shard, *(common + list(shards))))
+    return Report.combine(reports)
+
+
+def _check_shard(function, args, rtol, atol, vectorize, xs, expected):
+    got = None
+    if vectorize and xs:
+        got = array_values(functools.partial(function, *args), xs)
+    if got is None:
+        got = _object_array([function(*(args + (x,))) for x in xs])
+    return check(got, _object_array(expected) if _needs_objects(expected)
+                 else expected, rtol, atol, inputs=_object_array(xs))
+
+
+def _needs_objects(values):
+    # Big ints and Fractions must not be squeezed into int64 or float64.
+    return any(not isinstance(v, (bool, int, float, complex)) or
+               (isinstance(v, int) and not -2**63 <= v < 2**63)
+               for v in values)
+
+
+def _object_array(values):
+    if not _needs_objects(values):
+        return mathx.asarray(values)
+    array = mathx.empty(len(values), dtype=object)
+    array[:] = values
+    return array
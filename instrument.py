@@ -0,0 +1,268 @@
+'''
+Opt-in instrumentation of the functions passed to the appendix helpers.
+
+The engines behind tab() and friends (tabulation.tabulate()), sigma() and
+prod() (accumulate.total() and product()), cascade() (iteration.cascade())
+and chapter_01.composite() pass each user function through instrument()
+before calling it. Normally instrument() returns the function unchanged,
+so the only cost is one global lookup per helper call. Inside a Recorder
+it returns a wrapper that records, for each function:
+
+    calls      -- number of calls
+    evaluations-- number of inputs evaluated: one per call, or the size of
+                  the array for a vectorized call
+    seconds    -- total time spent in the function
+    percentiles-- 50th, 90th and 99th percentile latency in seconds,
+                  estimated from a random sample of SAMPLE_SIZE calls
+    low, high  -- smallest and largest numeric argument seen
+    histogram  -- number of inputs per order of magnitude of the argument
+
+"The argument" is the last positional one, which is the input the
+helpers vary; the elements of an array argument count one by one. Its
+histogram bins are labelled by decade: '1e3' counts arguments with
+1000 <= x < 10000, '-1e3' the same range of negative numbers, and '0'
+counts zeros. Functions are recorded under their names; a different
+function with a name already taken, such as a second lambda, is recorded
+as 'name@id' with its id() in hex.
+
+    with Recorder(max_evaluations=10**6) as recorder:
+        tab(f34, 1, 100)
+        sigma(g, 1, 1000)
+    print(recorder.to_json(indent=2))
+
+Calls made on symbolic values while a helper checks for a polynomial or
+affine function count as calls, but they are left out of the histogram.
+Calls made in worker processes by the parallel reductions are not
+recorded.
+'''
+
+import functools
+import json
+import math
+import numbers
+import random
+import time
+
+from lazy import lazy_import
+
+mathx = lazy_import('numpy')
+
+# Number of call latencies kept per function for the percentiles.
+SAMPLE_SIZE = 10000
+
+PERCENTILES = (50, 90, 99)
+
+# The innermost Recorder in effect, or None.
+_active = None
+
+
+class BudgetExceeded(RuntimeError):
+    """Raised when a Recorder's max_evaluations would be exceeded."""
+
+
+def instrument(function):
+    """Returns function, wrapped by the active Recorder if there is one."""
+    if _active is None:
+        return function
+    return _active.wrap(function)
+
+
+class Recorder(object):
+    """Collects call statistics while it is active.
+
+    Args:
+        max_evaluations: Optional limit on the total number of evaluations
+                         of all recorded functions, counting every element
+                         of an array argument. The call that would exceed
+                         it raises BudgetExceeded instead.
+    """
+
+    def __init__(self, max_evaluations=None):
+        self.max_evaluations = max_evaluations
+        self.evaluations = 0
+        self._functions = {}
+        self._previous = None
+
+    def __enter__(self):
+        global _active
+        self._previous = _active
+        _active = self
+        return self
+
+    def __exit__(self, *exc_info):
+        global _active
+        _active = self._previous
+        return False
+
+    def wrap(self, function, name=None):
+        """Returns function wrapped to record its calls under name.
+
+        The name defaults to the function's __name__ (that of the
+        underlying function for a functools.partial), with '@' and its
+        id() appended if another function was recorded under that name.
+        Can be used as a decorator, @recorder.wrap, outside of any helper.
+        """
+        if getattr(function, '_recorder', None) is self:
+            return function
+        if name is None:
+            name, stats = self._lookup(function)
+        else:
+            stats = self._functions.get(name)
+        if stats is None:
+            stats = self._functions[name] = _Stats(_unwrap(function))
+        clock = time.perf_counter
+
+        def wrapper(*args, **keywords):
+            x = args[-1] if args else None
+            count = x.size if getattr(x, 'ndim', 0) else 1
+            if (self.max_evaluations is not None and
+                    self.evaluations + count > self.max_evaluations):
+                raise BudgetExceeded('more than %d evaluations'
+                                     % self.max_evaluations)
+            self.evaluations += count
+            start = clock()
+            try:
+                return function(*args, **keywords)
+            finally:
+                stats.add(clock() - start, x, count)
+
+        wrapper._recorder = self
+        wrapper.__name__ = name
+        wrapper.__wrapped__ = function
+        return wrapper
+
+    def _lookup(self, function):
+        # Returns the key and _Stats, or None, for a function recorded
+        # under its default name.
+        name = _name(function)
+        stats = self._functions.get(name)
+        if stats is None or stats.function is _unwrap(function):
+            return name, stats
+        name = '%s@%x' % (name, id(_unwrap(function)))
+        return name, self._functions.get(name)
+
+    def stats(self):
+        """Returns the statistics as a dict of plain Python values."""
+        return {'evaluations': self.evaluations,
+                'max_evaluations': self.max_evaluations,
+                'functions': {name: stats.as_dict() for name, stats
+                              in sorted(self._functions.items())}}
+
+    def to_json(self, **keywords):
+        """Returns stats() as a JSON string; keywords go to json.dumps()."""
+        return json.dumps(self.stats(), **keywords)
+
+
+def _name(function):
+    function = _unwrap(function)
+    return getattr(function, '__name__', type(function).__name__)
+
+
+def _unwrap(function):
+    while isinstance(function, functools.partial):
+        function = function.func
+    return function
+
+
+class _Stats(object):
+    __slots__ = ('function', 'calls', 'evaluations', 'seconds', 'sample',
+                 'low', 'high', 'histogram', 'random')
+
+    def __init__(self, function):
+        # Kept so that its id() cannot be reused while it is recorded.
+        self.function = function
+        self.calls = 0
+        self.evaluations = 0
+        self.seconds = 0.0
+        self.sample = []
+        self.low = self.high = None
+        self.histogram = {}
+        self.random = random.Random(0)
+
+    def add(self, seconds, x, count=1):
+        self.calls += 1
+        self.evaluations += count
+        self.seconds += seconds
+        # Reservoir sampling keeps a uniform sample of all the latencies.
+        if len(self.sample) < SAMPLE_SIZE:
+            self.sample.append(seconds)
+        else:
+            j = self.random.randrange(self.calls)
+            if j < SAMPLE_SIZE:
+                self.sample[j] = seconds
+        if getattr(x, 'ndim', 0):
+            self._add_array(x)
+            return
+        if not isinstance(x, numbers.Real):
+            return
+        self._extend(x, x)
+        key = _decade(x)
+        self.histogram[key] = self.histogram.get(key, 0) + 1
+
+    def _add_array(self, x):
+        x = mathx.asarray(x).ravel()
+        if x.dtype.kind not in 'iuf' or x.size == 0:
+            return
+        values = x[~mathx.isnan(x)] if x.dtype.kind == 'f' else x
+        if values.size:
+            self._extend(values.min().item(), values.max().item())
+        for key, count in _decades(x).items():
+            self.histogram[key] = self.histogram.get(key, 0) + count
+
+    def _extend(self, low, high):
+        if self.low is None or low < self.low:
+            self.low = low
+        if self.high is None or high > self.high:
+            self.high = high
+
+    def as_dict(self):
+        sample = sorted(self.sample)
+        percentiles = {}
+        for p in PERCENTILES:
+            if sample:
+                rank = max(0, math.ceil(p / 100.0 * len(sample)) - 1)
+                percentiles['p%d' % p] = sample[rank]
+        return {'calls': self.calls,
+                'evaluations': self.evaluations,
+                'seconds': self.seconds,
+                'percentiles': percentiles,
+                'low': _plain(self.low),
+                'high': _plain(self.high),
+                'histogram': dict(self.histogram)}
+
+
+def _decade(x):
+    if x == 0:
+        return '0'
+    try:
+        exponent = math.floor(math.log10(abs(x)))
+    except (OverflowError, ValueError):
+        return str(float(x))            # inf or nan
+    return '%s1e%d' % ('-' if x < 0 else '', exponent)
+
+
+def _decades(x):
+    # The histogram counts of a 1-D array, keyed as by _decade().
+    with mathx.errstate(all='ignore'):
+        floats = x.astype(mathx.float64)
+        exponents = mathx.floor(mathx.log10(mathx.abs(floats)))
+    finite = mathx.isfinite(exponents)
+    counts = {}
+    for negative in (False, True):
+        side = finite & ((floats < 0) == negative)
+        keys, sizes = mathx.unique(exponents[side], return_counts=True)
+        for exponent, size in zip(keys.tolist(), sizes.tolist()):
+            counts['%s1e%d' % ('-' if negative else '', exponent)] = size
+    for value in floats[~finite].tolist():
+        key = _decade(value)
+        counts[key] = counts.get(key, 0) + 1
+    return counts
+
+
+def _plain(x):
+    # NumPy scalars and Fractions become ints or floats for JSON.
+    if x is None or isinstance(x, (int, float)):
+        return x
+    if isinstance(x, numbers.Integral):
+        return int(x)
+    return float(x)
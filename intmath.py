@@ -0,0 +1,80 @@
+'''
+Factorial and power kernels.
+
+The recursive definitions in chapter_01.py and appendix1.py make one call
+per unit, so factorial(5000) or power30b(2, 5000) raises RecursionError.
+These compute the same values with iteration and binary exponentiation.
+factorial_range() and power_range() produce a whole column of values with
+one multiplication per row, for use with tab() and friends.
+'''
+
+import functools
+import math
+import numbers
+
+
+@functools.lru_cache(maxsize=256, typed=True)
+def factorial(n):
+    """Returns n! for a non-negative whole number n.
+
+    ints use math.factorial; whole floats such as 5.0 give a float, as the
+    recursive definition did. Results are kept in a bounded memo table.
+    """
+    if isinstance(n, int):
+        return math.factorial(n)
+    if n < 0 or n != int(n):
+        raise ValueError("factorial() needs a non-negative whole number")
+    result = 1
+    while n > 0:
+        result *= n
+        n -= 1
+    return result
+
+
+def power(n, e):
+    """Returns n ** e for a non-negative whole number e in O(log e)
+    multiplications.
+
+    A whole float e such as 3.0 counts as the int 3, as it did for the
+    recursive definitions, so the result has the type of n. ints use the
+    built-in pow, which does binary exponentiation in C; any other n that
+    supports * (floats, Fractions, ...) is squared and multiplied in a loop.
+    """
+    if not isinstance(e, int):
+        if not isinstance(e, numbers.Real) or not float(e).is_integer():
+            raise ValueError("power() needs a non-negative whole exponent")
+        e = int(e)
+    if e < 0:
+        raise ValueError("power() needs a non-negative whole exponent")
+    if isinstance(n, int):
+        return n ** e
+    result = 1
+    while e:
+        if e & 1:
+            result = result * n
+        e >>= 1
+        if e:
+            n = n * n
+    return result
+
+
+def factorial_range(start, end):
+    """Returns [start!, (start+1)!, ..., end!] using one multiplication per
+    value after the first."""
+    if end < start:
+        return []
+    values = [factorial(start)]
+    for i in range(start + 1, end + 1):
+        values.append(values[-1] * i)
+    return values
+
+
+def power_range(n, start, end):
+    """Returns [n**start, n**(start+1), ..., n**end] using one multiplication
+    per value after the first."""
+    if end < start:
+        return []
+    values = [power(n, start)]
+    for i in range(start + 1, end + 1):
+        values.append(values[-1] * n)
+    return values
@@ -0,0 +1,223 @@
+'''
+Iterating functions: the engine behind appendix1.cascade().
+
+cascade(n, f, x) applies f to x n times. Like Logo's CASCADE it also
+takes several function/value pairs,
+
+    cascade(n, f, x, g, y, ...)
+
+where each step replaces every value at once with f(x, y, ...),
+g(x, y, ...), ... and the result is the final x. For example
+cascade(n, lambda a, b: a + b, 0, lambda a, b: a, 1) is the n-th
+Fibonacci number.
+
+Instead of always taking n steps, cascade():
+
+    * recognizes affine maps (every function a linear combination of the
+      values plus a constant) by calling them on symbolic values, and
+      raises the map's matrix to the n-th power by repeated squaring, in
+      O(log n) matrix products;
+    * otherwise iterates, watching for a repeated value with Brent's cycle
+      detection, which needs no memory beyond two values. Once a cycle is
+      found it jumps straight to step n;
+    * optionally stops at a fixed point, once a step moves the value by no
+      more than a tolerance.
+'''
+
+import numbers
+
+from instrument import instrument
+
+
+def cascade(n, f, *args, **keywords):
+    """Applies a function (or several function/value pairs) n times.
+
+    Args:
+        n:         Number of steps, a non-negative int.
+        f:         The first function.
+        *args:     The first value, followed by any further function/value
+                   pairs.
+        tolerance: Optional keyword. Stop early, returning the current
+                   value, once a step changes each value by at most this.
+    Returns:
+        The first value after n steps.
+    """
+    tolerance = keywords.get('tolerance')
+    functions = [instrument(g) for g in [f] + list(args[1::2])]
+    values = [args[0]] + list(args[2::2])
+    if len(functions) != len(values):
+        raise TypeError("cascade() needs a value after every function")
+    if len(functions) == 1:
+        step = functions[0]
+        x = values[0]
+    else:
+        def step(state):
+            return tuple(g(*state) for g in functions)
+        x = tuple(values)
+    if n <= 0:
+        return values[0]
+    if all(isinstance(v, numbers.Number) for v in values):
+        matrix = _affine_matrix(functions, sum(values) * 0 + 1)
+        if matrix is not None:
+            vector = _mat_vec(_mat_pow(matrix, n), values + [1])
+            return vector[0]
+    x = _iterate(step, x, n, tolerance)
+    return x if len(functions) == 1 else x[0]
+
+
+def _iterate(step, x, n, tolerance):
+    if n <= 0:
+        return x
+    # Brent's algorithm: tortoise waits at steps 1, 2, 4, 8, ... while x
+    # runs ahead; if x meets it, the values repeat with period lam.
+    tortoise = x
+    power = lam = 1
+    previous = x
+    x = step(x)
+    i = 1
+    while i < n:
+        if tolerance is not None and _within(x, previous, tolerance):
+            return x
+        if _same(x, tortoise):
+            for j in range((n - i) % lam):
+                x = step(x)
+            return x
+        if power == lam:
+            tortoise = x
+            power *= 2
+            lam = 0
+        previous = x
+        x = step(x)
+        i += 1
+        lam += 1
+    return x
+
+
+def _same(a, b):
+    try:
+        return bool(a == b)
+    except (TypeError, ValueError):
+        return False
+
+
+def _within(a, b, tolerance):
+    if not isinstance(a, tuple):
+        a, b = (a,), (b,)
+    try:
+        return all(abs(p - q) <= tolerance for p, q in zip(a, b))
+    except (TypeError, ValueError):
+        return False
+
+
+class _AffineForm(object):
+    """c[0]*v0 + c[1]*v1 + ... + const, for tracing affine functions."""
+    __slots__ = ('coeffs', 'const')
+    __hash__ = None
+
+    def __init__(self, coeffs, const):
+        self.coeffs = coeffs
+        self.const = const
+
+    def _is_constant(self):
+        return not any(self.coeffs)
+
+    def __add__(self, other):
+        if isinstance(other, _AffineForm):
+            return _AffineForm([a + b for a, b in
+                                zip(self.coeffs, other.coeffs)],
+                               self.const + other.const)
+        if isinstance(other, numbers.Number):
+            return _AffineForm(self.coeffs, self.const + other)
+        return NotImplemented
+
+    __radd__ = __add__
+
+    def __neg__(self):
+        return _AffineForm([-c for c in self.coeffs], -self.const)
+
+    def __pos__(self):
+        return self
+
+    def __sub__(self, other):
+        return self + (-other)
+
+    def __rsub__(self, other):
+        return (-self) + other
+
+    def __mul__(self, other):
+        if isinstance(other, _AffineForm):
+            if other._is_constant():
+                other = other.const
+            elif self._is_constant():
+                return other * self.const
+            else:
+                raise TypeError('product of two variables is not affine')
+        if isinstance(other, numbers.Number):
+            return _AffineForm([c * other for c in self.coeffs],
+                               self.const * other)
+        return NotImplemented
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, other):
+        if isinstance(other, _AffineForm) and other._is_constant():
+            other = other.const
+        if isinstance(other, numbers.Number):
+            return _AffineForm([c / other for c in self.coeffs],
+                               self.const / other)
+        raise TypeError('division by a variable is not affine')
+
+    def __eq__(self, other):
+        raise TypeError('cannot compare symbolic values')
+
+    __ne__ = __lt__ = __le__ = __gt__ = __ge__ = __eq__
+
+    def __bool__(self):
+        raise TypeError('truth value of a symbolic value')
+
+
+def _affine_matrix(functions, one):
+    # Returns the (k+1) x (k+1) matrix of the map, the last row being
+    # [0, ..., 0, 1], or None if some function is not affine. one is 1 in
+    # the type the values promote to, so that e.g. x / 3 traces to a float
+    # coefficient for int values and to a Fraction for Fraction values.
+    k = len(functions)
+    zero = one * 0
+    variables = [_AffineForm([one if i == j else zero for j in range(k)],
+                             zero)
+                 for i in range(k)]
+    rows = []
+    for g in functions:
+        try:
+            form = g(*variables)
+        except Exception:
+            # e.g. IndexError from perm[x]: not affine, so iterate instead.
+            return None
+        if isinstance(form, numbers.Number):
+            form = _AffineForm([0] * k, form)
+        if not isinstance(form, _AffineForm):
+            return None
+        rows.append(list(form.coeffs) + [form.const])
+    rows.append([0] * k + [1])
+    return rows
+
+
+def _mat_mul(a, b):
+    columns = list(zip(*b))
+    return [[sum(x * y for x, y in zip(row, column)) for column in columns]
+            for row in a]
+
+
+def _mat_vec(a, v):
+    return [sum(x * y for x, y in zip(row, v)) for row in a]
+
+
+def _mat_pow(a, n):
+    result = [[int(i == j) for j in range(len(a))] for i in range(len(a))]
+    while n:
+        if n & 1:
+            result = _mat_mul(result, a)
+        n >>= 1
+        if n:
+            a = _mat_mul(a, a)
+    return result
@@ -0,0 +1,33 @@
+'''
+Deferred imports of heavy modules.
+
+    mathx = lazy_import('numpy')
+
+binds mathx to a stand-in that imports NumPy the first time one of its
+attributes is used. Modules that need NumPy only for some of their
+functions use this, so that `from appendix1 import *` does not pay for
+loading it.
+'''
+
+import importlib
+
+
+class LazyModule(object):
+    """Stand-in for a module that is imported on first attribute access."""
+
+    def __init__(self, name):
+        self._lazy_name = name
+
+    def __repr__(self):
+        return '<lazy module %r>' % self._lazy_name
+
+    def __getattr__(self, attr):
+        module = importlib.import_module(self._lazy_name)
+        # Copy the namespace so later lookups skip __getattr__ entirely.
+        self.__dict__.update(module.__dict__)
+        return getattr(module, attr)
+
+
+def lazy_import(name):
+    """Returns a LazyModule for the module called name."""
+    return LazyModule(name)
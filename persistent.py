@@ -0,0 +1,281 @@
+'''
+Persistent sequences for the Logo-style list primitives.
+
+fput(), bf() and friends in appendix1.py copy a whole Python list each
+time they are called, so a recursive procedure that walks a list with
+first() and bf() takes O(n**2) time and memory. The two immutable
+sequences here share structure between the old and new versions instead:
+
+    ConsList -- a singly linked list. fput(), first() and bf() are O(1).
+                lput(), bl() and last() copy or walk the list, O(n).
+    Vector   -- a 32-way trie of tuples, like Clojure's vectors. item(),
+                setitem() and lput() are O(log n), which is at most 7 steps
+                below 2**35 items. bf() and bl() are O(1) views, and
+                fput() is amortized O(log n).
+
+The primitives in appendix1.py accept these along with lists and return
+the same kind of sequence they are given:
+
+    >>> l = ConsList(range(5))
+    >>> bf(fput(9, l))
+    ConsList([0, 1, 2, 3, 4])
+
+Both types are collections.abc.Sequences. They compare equal to lists and
+tuples with the same items, and they support + with other iterables.
+'''
+
+import collections.abc
+import itertools
+
+BITS = 5
+WIDTH = 1 << BITS
+MASK = WIDTH - 1
+
+
+def _slice_range(s, n):
+    start, stop, step = s.indices(n)
+    return start, max(start, stop) if step == 1 else stop, step
+
+
+class _Persistent(collections.abc.Sequence):
+    __slots__ = ()
+    __hash__ = None
+
+    def __repr__(self):
+        return '%s(%r)' % (type(self).__name__, list(self))
+
+    def __eq__(self, other):
+        if not isinstance(other, (_Persistent, list, tuple)):
+            return NotImplemented
+        return len(self) == len(other) and all(
+            a == b for a, b in zip(self, other))
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+    def __add__(self, other):
+        return type(self)(itertools.chain(self, other))
+
+    def __radd__(self, other):
+        return type(self)(itertools.chain(other, self))
+
+
+class ConsList(_Persistent):
+    """An immutable singly linked list.
+
+    ConsList(iterable) builds the list in O(n); after that fput() shares
+    the whole list as its tail and bf() returns the tail itself.
+    """
+    __slots__ = ('_head', '_tail', '_length')
+
+    def __init__(self, iterable=()):
+        node = _EMPTY
+        for item in reversed(list(iterable)):
+            node = node.fput(item)
+        self._head = node._head
+        self._tail = node._tail
+        self._length = node._length
+
+    @classmethod
+    def _cons(cls, head, tail):
+        node = object.__new__(cls)
+        node._head = head
+        node._tail = tail
+        node._length = tail._length + 1 if tail is not None else 0
+        return node
+
+    def __len__(self):
+        return self._length
+
+    def __iter__(self):
+        node = self
+        while node._length:
+            yield node._head
+            node = node._tail
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            start, stop, step = _slice_range(i, self._length)
+            if step == 1 and stop == self._length:
+                return self._drop(start)
+            return ConsList(itertools.islice(self, start, stop, step)
+                            if step > 0 else list(self)[i])
+        if i < 0:
+            i += self._length
+        if not 0 <= i < self._length:
+            raise IndexError('ConsList index out of range')
+        return self._drop(i)._head
+
+    def _drop(self, k):
+        node = self
+        for i in range(k):
+            node = node._tail
+        return node
+
+    def __add__(self, other):
+        # The result shares other when it is a ConsList as well.
+        if not isinstance(other, ConsList):
+            return _Persistent.__add__(self, other)
+        node = other
+        for item in reversed(list(self)):
+            node = node.fput(item)
+        return node
+
+    def fput(self, item):
+        """Returns item followed by this list, in O(1)."""
+        return ConsList._cons(item, self)
+
+    def lput(self, item):
+        """Returns this list followed by item, in O(n)."""
+        return self + [item]
+
+    def setitem(self, i, item):
+        """Returns a copy with item i replaced, sharing the part after it."""
+        if i < 0:
+            i += self._length
+        if not 0 <= i < self._length:
+            raise IndexError('ConsList index out of range')
+        before = list(itertools.islice(self, i))
+        node = self._drop(i + 1).fput(item)
+        for x in reversed(before):
+            node = node.fput(x)
+        return node
+
+
+_EMPTY = ConsList._cons(None, None)
+
+
+class Vector(_Persistent):
+    """An immutable vector stored in a trie of tuples.
+
+    Updates copy only the path from the root to one leaf, so the old and
+    new vectors share everything else. Slices with step 1 are views that
+    share the whole trie.
+    """
+    __slots__ = ('_root', '_shift', '_count', '_start', '_stop')
+
+    def __init__(self, iterable=()):
+        items = tuple(iterable)
+        nodes = [items[i:i + WIDTH] for i in range(0, len(items), WIDTH)]
+        shift = 0
+        while len(nodes) > 1:
+            nodes = [tuple(nodes[i:i + WIDTH])
+                     for i in range(0, len(nodes), WIDTH)]
+            shift += BITS
+        self._root = nodes[0] if nodes else ()
+        self._shift = shift
+        self._count = len(items)
+        self._start = 0
+        self._stop = len(items)
+
+    def _make(self, root, shift, count, start, stop):
+        vector = object.__new__(Vector)
+        vector._root = root
+        vector._shift = shift
+        vector._count = count
+        vector._start = start
+        vector._stop = stop
+        return vector
+
+    def __len__(self):
+        return self._stop - self._start
+
+    def __iter__(self):
+        return itertools.islice(_walk(self._root, self._shift),
+                                self._start, self._stop)
+
+    def __getitem__(self, i):
+        n = self._stop - self._start
+        if isinstance(i, slice):
+            start, stop, step = _slice_range(i, n)
+            if step == 1:
+                return self._make(self._root, self._shift, self._count,
+                                  self._start + start, self._start + stop)
+            return Vector(list(self)[i])
+        if i < 0:
+            i += n
+        if not 0 <= i < n:
+            raise IndexError('Vector index out of range')
+        return _get(self._root, self._shift, self._start + i)
+
+    def setitem(self, i, item):
+        """Returns a copy with item i replaced, in O(log n)."""
+        n = self._stop - self._start
+        if i < 0:
+            i += n
+        if not 0 <= i < n:
+            raise IndexError('Vector index out of range')
+        return self._make(_set(self._root, self._shift, self._start + i,
+                               item),
+                          self._shift, self._count, self._start, self._stop)
+
+    def lput(self, item):
+        """Returns this vector followed by item, in O(log n)."""
+        if self._stop < self._count:
+            # A view: overwrite the slot after it in a copy of the path.
+            root = _set(self._root, self._shift, self._stop, item)
+            return self._make(root, self._shift, self._count, self._start,
+                              self._stop + 1)
+        root, shift = self._root, self._shift
+        if self._count == WIDTH << shift:
+            root, shift = (root, _path(shift, item)), shift + BITS
+        else:
+            root = _push(root, shift, self._count, item)
+        return self._make(root, shift, self._count + 1, self._start,
+                          self._stop + 1)
+
+    def fput(self, item):
+        """Returns item followed by this vector.
+
+        Uses a free slot before the view when there is one. Otherwise the
+        vector is rebuilt with as many free slots in front as it has items,
+        so a run of fput() calls costs amortized O(log n) each.
+        """
+        if self._start > 0:
+            root = _set(self._root, self._shift, self._start - 1, item)
+            return self._make(root, self._shift, self._count,
+                              self._start - 1, self._stop)
+        pad = max(len(self), WIDTH)
+        vector = Vector(itertools.chain(itertools.repeat(None, pad), self))
+        vector._start = pad
+        return vector.fput(item)
+
+
+def _walk(node, shift):
+    if shift == 0:
+        return iter(node)
+    return itertools.chain.from_iterable(_walk(child, shift - BITS)
+                                         for child in node)
+
+
+def _get(node, shift, i):
+    while shift > 0:
+        node = node[(i >> shift) & MASK]
+        shift -= BITS
+    return node[i & MASK]
+
+
+def _set(node, shift, i, item):
+    j = (i >> shift) & MASK
+    if shift > 0:
+        item = _set(node[j], shift - BITS, i, item)
+    return node[:j] + (item,) + node[j + 1:]
+
+
+def _push(node, shift, i, item):
+    # Appends item as element i of a left-packed trie that is not full.
+    if shift == 0:
+        return node + (item,)
+    j = (i >> shift) & MASK
+    if j < len(node):
+        return node[:j] + (_push(node[j], shift - BITS, i, item),)
+    return node + (_path(shift - BITS, item),)
+
+
+def _path(shift, item):
+    node = (item,)
+    while shift > 0:
+        node = (node,)
+        shift -= BITS
+    return node
@@ -0,0 +1,161 @@
+'''
+Polynomials with exact coefficients, and a tracer that recognizes
+polynomial functions.
+
+Calling an ordinary Python function such as f34(x) = x * x + 3 * x - 2 on
+the variable X returns Polynomial([1, 3, -2]) instead of a number, because
+Polynomial overloads the arithmetic operators. trace() uses this to find
+out whether a function is a polynomial, much as dual.py pushes dual
+numbers through a function to differentiate it. Anything a polynomial
+cannot do -- comparisons, truth tests, int(), abs(), division by a
+non-constant -- raises TypeError, so functions with branches or
+non-polynomial steps are reported as not polynomial. trace() treats any
+other exception the same way.
+'''
+
+# Largest degree a traced polynomial may reach before tracing gives up.
+MAX_DEGREE = 64
+
+
+class Polynomial(object):
+    """A polynomial in one variable, coefficients highest power first."""
+    __slots__ = ('coeffs',)
+
+    # Make ndarray op Polynomial defer to the Polynomial methods.
+    __array_ufunc__ = None
+    __hash__ = None
+
+    def __init__(self, coeffs):
+        coeffs = list(coeffs)
+        while len(coeffs) > 1 and coeffs[0] == 0:
+            coeffs.pop(0)
+        self.coeffs = coeffs or [0]
+
+    @property
+    def degree(self):
+        return len(self.coeffs) - 1
+
+    def __repr__(self):
+        return 'Polynomial(%r)' % (self.coeffs,)
+
+    def __call__(self, x):
+        """Evaluates the polynomial by Horner's rule.
+
+        x may be a number, an ndarray or another Polynomial (composition).
+        """
+        result = self.coeffs[0] + 0 * x
+        for c in self.coeffs[1:]:
+            result = result * x + c
+        return result
+
+    def _coerce(self, other):
+        if isinstance(other, Polynomial):
+            return other
+        if _is_number(other):
+            return Polynomial([other])
+        raise TypeError('cannot combine Polynomial with %s'
+                        % type(other).__name__)
+
+    def __add__(self, other):
+        other = self._coerce(other)
+        a, b = self.coeffs, other.coeffs
+        if len(a) < len(b):
+            a, b = b, a
+        pad = len(a) - len(b)
+        return Polynomial(a[:pad] + [x + y for x, y in zip(a[pad:], b)])
+
+    __radd__ = __add__
+
+    def __neg__(self):
+        return Polynomial([-c for c in self.coeffs])
+
+    def __pos__(self):
+        return self
+
+    def __sub__(self, other):
+        return self + (-self._coerce(other))
+
+    def __rsub__(self, other):
+        return self._coerce(other) - self
+
+    def __mul__(self, other):
+        other = self._coerce(other)
+        if self.degree + other.degree > MAX_DEGREE:
+            raise TypeError('degree exceeds MAX_DEGREE')
+        product = [0] * (len(self.coeffs) + len(other.coeffs) - 1)
+        for i, a in enumerate(self.coeffs):
+            for j, b in enumerate(other.coeffs):
+                product[i + j] = product[i + j] + a * b
+        return Polynomial(product)
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, other):
+        other = self._coerce(other)
+        if other.degree > 0:
+            raise TypeError('cannot divide by a non-constant Polynomial')
+        return Polynomial([c / other.coeffs[0] for c in self.coeffs])
+
+    def __pow__(self, e):
+        if not isinstance(e, int) or e < 0:
+            raise TypeError('Polynomial powers must be non-negative ints')
+        if self.degree * e > MAX_DEGREE:
+            raise TypeError('degree exceeds MAX_DEGREE')
+        result = Polynomial([1])
+        base = self
+        while e:
+            if e & 1:
+                result = result * base
+            e >>= 1
+            if e:
+                base = base * base
+        return result
+
+    def __eq__(self, other):
+        if isinstance(other, Polynomial):
+            return self.coeffs == other.coeffs
+        if self.degree > 0:
+            raise TypeError('cannot compare a non-constant Polynomial')
+        return self.coeffs[0] == other
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __bool__(self):
+        if self.degree > 0:
+            raise TypeError('truth value of a non-constant Polynomial')
+        return bool(self.coeffs[0])
+
+
+# The variable x.
+X = Polynomial([1, 0])
+
+
+def _is_number(v):
+    # Fractions and NumPy scalars are accepted along with the builtins.
+    return (isinstance(v, (int, float, complex)) or
+            hasattr(v, 'denominator') or
+            (hasattr(v, 'dtype') and getattr(v, 'ndim', None) == 0))
+
+
+def trace(function, *args):
+    """Returns function as a Polynomial, or None if it is not one.
+
+    Args:
+        function: A function called as function(*args, x).
+        *args:    Other arguments for the function, held constant.
+    Returns:
+        The Polynomial p with p(x) == function(*args, x), or None if the
+        function does something a polynomial cannot.
+    """
+    try:
+        result = function(*(args + (X,)))
+    except Exception:
+        # Whatever the function cannot do with X -- index an array with it,
+        # look it up in a dict, ... -- means it is not a polynomial.
+        return None
+    if isinstance(result, Polynomial):
+        return result
+    if _is_number(result):
+        return Polynomial([result])
+    return None
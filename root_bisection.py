@@ -3,30 +3,268 @@
 This is a program to find root of equation f(x) = exp(x) * ln(x) - x * x = 0
 using bisection method.
 
+root_bisection() solves a single bracket. root_bisection_batch() solves a
+whole array of brackets at once with a NumPy-vectorized func. root_brent()
+solves a single bracket with Brent's method, which usually needs far fewer
+evaluations of func than plain bisection.
+
 
 
 
 
 '''
 
+import math
+import sys
+import time
+
+import numpy as mathx
+
+from root_result import RootResult
+
+# root_bisection_batch() works on whole arrays under a mask until fewer
+# than this fraction of the brackets are still active, then on a compacted
+# array of just those.
+COMPACT_FRACTION = 0.125
+
 
+def root_bisection(func,lower_estimate,higher_estimate,tolerance=1.0e-6,
+                   callback=None, full_output=False):
+    """Finds a root in a bracket by repeated halving.
 
-def root_bisection(func,lower_estimate,higher_estimate,tolerance=1.0e-6):
-    print(func(lower_estimate))
-    print(func(higher_estimate))
-    #if func(lower_estimate) * func(higher_estimate) > 0.0:
-    #    print("No root lies between these values")
-    #else:
-    #    diff = abs(higher_estimate - lower_estimate)
+    Args:
+        func:            A function of one variable.
+        lower_estimate:  One end of the bracket.
+        higher_estimate: Other end of the bracket.
+        tolerance:       Width of the bracket at which to stop.
+        callback:        Optional function called as callback(n, x, fx)
+                         after each step.
+        full_output:     If true, return a RootResult instead of the root.
+    Returns:
+        The last midpoint, or a RootResult if full_output is true. The
+        result only counts as converged if func changes sign across the
+        original bracket.
+    """
+    start = time.perf_counter()
+    f_lower = func(lower_estimate)
+    f_higher = func(higher_estimate)
+    bracketed = not (f_lower * f_higher > 0.0)
+    evaluations = 2
+    n = 0
+    x = (lower_estimate + higher_estimate)/2.0
+    fx = None
     diff = abs(higher_estimate - lower_estimate)
     while diff > tolerance:
         x = (lower_estimate + higher_estimate)/2.0
-       # print(func(x))
-        check_val_1 = func(x)*func(lower_estimate)
-        check_val_2 = func(x)*func(higher_estimate)
-        if check_val_1 > 0:
-           lower_estimate = x
+        fx = func(x)
+        evaluations += 1
+        n += 1
+        if fx*f_lower > 0:
+            lower_estimate = x
+            f_lower = fx
         else:
             higher_estimate = x
         diff = abs(higher_estimate -lower_estimate)
-    return x
+        if callback is not None:
+            callback(n, x, fx)
+    if not full_output:
+        return x
+    if fx is None:
+        fx = func(x)
+        evaluations += 1
+    return RootResult(x, n, evaluations, abs(fx), bracketed,
+                      time.perf_counter() - start)
+
+
+def root_brent(func, lower_estimate, higher_estimate, tolerance=1.0e-6,
+               max_iter=100, callback=None, full_output=False):
+    """Finds a root in a bracket with Brent's method.
+
+    Each step tries inverse quadratic or secant interpolation and falls
+    back to bisection whenever the interpolated point is not a safe
+    improvement. The root stays bracketed throughout. Single steps can
+    shrink the bracket less than bisection would, but the fallback bounds
+    the total: where bisection needs k steps, Brent's method needs at most
+    about k**2, and usually far fewer on smooth functions.
+
+    Args:
+        func:            A function of one variable.
+        lower_estimate:  One end of the bracket.
+        higher_estimate: Other end of the bracket. func must change sign
+                         between the two ends.
+        tolerance:       Absolute tolerance on the root.
+        max_iter:        Maximum number of steps.
+        callback:        Optional function called as callback(n, x, fx)
+                         after each step.
+        full_output:     If true, return a RootResult instead of the root.
+    Returns:
+        The root, or a RootResult if full_output is true.
+    Raises:
+        ValueError: func has the same sign at both ends of the bracket.
+    """
+    start = time.perf_counter()
+    a = lower_estimate
+    b = higher_estimate
+    fa = func(a)
+    fb = func(b)
+    evaluations = 2
+    if (fa > 0 and fb > 0) or (fa < 0 and fb < 0):
+        raise ValueError("No root lies between these values")
+    c = b
+    fc = fb
+    d = e = b - a
+    converged = False
+    n = 0
+    while n < max_iter:
+        if (fb > 0 and fc > 0) or (fb < 0 and fc < 0):
+            # Keep the root bracketed between b and c.
+            c = a
+            fc = fa
+            d = e = b - a
+        if abs(fc) < abs(fb):
+            a, b, c = b, c, b
+            fa, fb, fc = fb, fc, fb
+        tol1 = 2.0 * sys.float_info.epsilon * abs(b) + 0.5 * tolerance
+        xm = 0.5 * (c - b)
+        if abs(xm) <= tol1 or fb == 0:
+            converged = True
+            break
+        if abs(e) >= tol1 and abs(fa) > abs(fb):
+            s = fb / fa
+            if a == c:
+                # Secant step.
+                p = 2.0 * xm * s
+                q = 1.0 - s
+            else:
+                # Inverse quadratic interpolation.
+                q = fa / fc
+                r = fb / fc
+                p = s * (2.0 * xm * q * (q - r) - (b - a) * (r - 1.0))
+                q = (q - 1.0) * (r - 1.0) * (s - 1.0)
+            if p > 0:
+                q = -q
+            p = abs(p)
+            if 2.0 * p < min(3.0 * xm * q - abs(tol1 * q), abs(e * q)):
+                e = d
+                d = p / q
+            else:
+                d = e = xm
+        else:
+            d = e = xm
+        a = b
+        fa = fb
+        if abs(d) > tol1:
+            b += d
+        else:
+            b += math.copysign(tol1, xm)
+        fb = func(b)
+        evaluations += 1
+        n += 1
+        if callback is not None:
+            callback(n, b, fb)
+    if full_output:
+        return RootResult(b, n, evaluations, abs(fb), converged,
+                          time.perf_counter() - start)
+    return b
+
+
+def root_bisection_batch(func, lower_estimates, higher_estimates,
+                         tolerance=1.0e-6, max_iter=200, args=()):
+    """Bisects every bracket in an array of brackets at once.
+
+    Args:
+        func:             A vectorized function called as func(x, *args)
+                          with 1-D arrays of points. It must return an
+                          array of the same length.
+        lower_estimates:  Array of lower ends of the brackets.
+        higher_estimates: Array of upper ends of the brackets.
+        tolerance:        Bracket width at which a bracket counts as solved.
+        max_iter:         Maximum number of bisection steps for any bracket.
+        args:             Extra arrays with one value per bracket, for
+                          solving a family of equations. They are
+                          broadcast with the brackets and flattened, and
+                          each call passes the values of the brackets in
+                          that call's x.
+    Returns:
+        A tuple (roots, converged, iterations) of arrays shaped like the
+        broadcast brackets. A bracket without a sign change is never
+        converged and its root is nan.
+
+    func is evaluated once at each end, then once per step on the midpoints
+    of all the brackets while most of them are still active (the finished
+    ones are masked out), and on just the active ones once fewer than
+    COMPACT_FRACTION are left; from then on func only sees those lanes, with
+    args gathered to match. Masks avoid gathering and scattering every
+    array on every step, which costs more than the few wasted evaluations.
+    """
+    lower = mathx.array(lower_estimates, dtype=float)
+    higher = mathx.array(higher_estimates, dtype=float)
+    args = [mathx.asarray(a) for a in args]
+    shape = mathx.broadcast(lower, higher, *args).shape
+    lower = mathx.broadcast_to(lower, shape).flatten()
+    higher = mathx.broadcast_to(higher, shape).flatten()
+    args = [mathx.broadcast_to(a, shape).ravel() for a in args]
+    f_lower = mathx.asarray(func(lower, *args), dtype=float)
+    f_higher = mathx.asarray(func(higher, *args), dtype=float)
+
+    roots = mathx.full(lower.shape, mathx.nan)
+    converged = mathx.zeros(lower.shape, dtype=bool)
+    iterations = mathx.zeros(lower.shape, dtype=int)
+
+    # Brackets with a zero at one of their ends are already solved.
+    converged[f_higher == 0] = True
+    roots[f_higher == 0] = higher[f_higher == 0]
+    converged[f_lower == 0] = True
+    roots[f_lower == 0] = lower[f_lower == 0]
+
+    active = ((f_lower < 0) != (f_higher < 0)) & ~converged
+    narrow = active & (abs(higher - lower) <= tolerance)
+    roots[narrow] = (lower[narrow] + higher[narrow]) / 2.0
+    converged[narrow] = True
+
+    active &= ~narrow
+    # Only the sign of func at the lower end matters, and moving the lower
+    # end to a point of the same sign never changes it. Finished brackets
+    # keep being bisected, but their roots and counts are already stored.
+    negative = f_lower < 0
+    step = 0
+    x = lower
+    while (step < max_iter and
+           mathx.count_nonzero(active) > COMPACT_FRACTION * active.size):
+        x = (lower + higher) / 2.0
+        fx = mathx.asarray(func(x, *args), dtype=float)
+        move_lower = ((fx < 0) == negative) & (fx != 0)
+        lower = mathx.where(move_lower, x, lower)
+        higher = mathx.where(move_lower, higher, x)
+        done = (abs(higher - lower) <= tolerance) | (fx == 0)
+        done &= active
+        step += 1
+        mathx.copyto(roots, x, where=done)
+        mathx.copyto(iterations, step, where=done)
+        converged |= done
+        active ^= done
+    if step:
+        roots[active] = x[active]
+        iterations[active] = step
+
+    idx = mathx.flatnonzero(active)
+    lower, higher, negative = lower[idx], higher[idx], negative[idx]
+    args = [a[idx] for a in args]
+    for step in range(step, max_iter):
+        if idx.size == 0:
+            break
+        x = (lower + higher) / 2.0
+        fx = mathx.asarray(func(x, *args), dtype=float)
+        move_lower = ((fx < 0) == negative) & (fx != 0)
+        lower = mathx.where(move_lower, x, lower)
+        higher = mathx.where(move_lower, higher, x)
+        done = (fx == 0) | (abs(higher - lower) <= tolerance)
+        roots[idx] = x
+        iterations[idx] = step + 1
+        converged[idx[done]] = True
+        keep = ~done
+        idx, lower, higher = idx[keep], lower[keep], higher[keep]
+        negative = negative[keep]
+        args = [a[keep] for a in args]
+    return (roots.reshape(shape), converged.reshape(shape),
+            iterations.reshape(shape))
@@ -1,26 +1,132 @@
+import time
+
+import numpy as mathx
+
+import dual
+from root_result import RootResult
+
 func = lambda x: x**2 -x -1
 derivative = lambda x: 2*x -1
 #initial_guess = 1.5
 epsilon = 1.0e-3
 N = 10
 
+# Status codes returned by root_newton_batch().
+CONVERGED = 0
+ZERO_DERIVATIVE = 1
+MAX_ITERATIONS = 2
+
+
+def root_newton_method(func,derivative,intial_guess,epsilon,N,callback=None,
+                       full_output=False):
+    """Finds a root with Newton's method.
 
-def root_newton_method(func,derivative,intial_guess,epsilon,N):
+    Args:
+        func:         A function of one variable.
+        derivative:   The derivative of func, or None to differentiate func
+                      with dual numbers.
+        intial_guess: Starting point.
+        epsilon:      Stop once abs(func(x)) < epsilon.
+        N:            Maximum number of iterations.
+        callback:     Optional function called as callback(n, x_n, fxn)
+                      each time func is evaluated.
+        full_output:  If true, return a RootResult instead of the root.
+    Returns:
+        The root, or None if the derivative vanished or N iterations were
+        not enough. With full_output a RootResult is returned either way.
+    """
+    start = time.perf_counter()
     x_n = intial_guess
-    print(x_n)
+    fxn = None
+    evaluations = 0
+    n = 0
+    converged = False
     for n in range(0,N):
-        print(x_n)
-        fxn = func(x_n)
-        print(fxn)
+        if derivative is None:
+            fxn, Dfxn = dual.evaluate(func, x_n)
+        else:
+            fxn = func(x_n)
+        evaluations += 1
+        if callback is not None:
+            callback(n, x_n, fxn)
         if abs(fxn) < epsilon:
-            print("Found soln after",n,"iteration",x_n)
-            return x_n
-        Dfxn = derivative(x_n)
+            converged = True
+            break
+        if derivative is not None:
+            Dfxn = derivative(x_n)
+            evaluations += 1
         if Dfxn == 0:
-            print("Zero Derivative. No Solution Found")
-            return None
+            break
         x_n = x_n- fxn/Dfxn
-    print("Exceeded maximum iterations. No solution found.")
+    else:
+        n = N
+    if full_output:
+        residual = None if fxn is None else abs(fxn)
+        return RootResult(x_n, n, evaluations, residual, converged,
+                          time.perf_counter() - start)
+    if converged:
+        return x_n
     return None
 
-root_newton_method(func,derivative,1.1,epsilon,N)
+
+def root_newton_batch(func, derivative, intial_guess, epsilon, N, args=()):
+    """Runs Newton's method from every element of an array of initial guesses.
+
+    Args:
+        func:         A vectorized function called as func(x, *args).
+        derivative:   A vectorized derivative of func, called the same way,
+                      or None to differentiate func with dual numbers.
+        intial_guess: Array of starting points, one per lane.
+        epsilon:      A lane is solved once abs(func(x)) < epsilon.
+        N:            Maximum number of iterations.
+        args:         Extra arrays with one value per lane, for solving a
+                      family of equations (for example the coefficients of
+                      a quadratic). They are masked along with x, so func
+                      only ever sees the lanes that are still active.
+    Returns:
+        A tuple (roots, status, iterations) of arrays shaped like
+        intial_guess. status holds CONVERGED, ZERO_DERIVATIVE or
+        MAX_ITERATIONS; roots are nan for lanes that did not converge.
+    """
+    x = mathx.array(intial_guess, dtype=float)
+    shape = x.shape
+    x = x.ravel()
+    args = [mathx.broadcast_to(mathx.asarray(a), shape).ravel() for a in args]
+    status = mathx.full(x.shape, MAX_ITERATIONS)
+    iterations = mathx.zeros(x.shape, dtype=int)
+    idx = mathx.arange(x.size)
+    for n in range(0, N):
+        if idx.size == 0:
+            break
+        x_n = x[idx]
+        lane_args = [a[idx] for a in args]
+        if derivative is None:
+            fxn, Dfxn = dual.evaluate(func, x_n, *lane_args)
+            Dfxn = mathx.broadcast_to(Dfxn, x_n.shape)
+        else:
+            fxn = func(x_n, *lane_args)
+        fxn = mathx.asarray(fxn, dtype=float)
+        found = abs(fxn) < epsilon
+        status[idx[found]] = CONVERGED
+        iterations[idx[found]] = n
+        live = ~found
+        idx, x_n, fxn = idx[live], x_n[live], fxn[live]
+        if derivative is None:
+            Dfxn = Dfxn[live]
+        else:
+            lane_args = [a[live] for a in lane_args]
+            Dfxn = mathx.broadcast_to(derivative(x_n, *lane_args), x_n.shape)
+        zero = Dfxn == 0
+        status[idx[zero]] = ZERO_DERIVATIVE
+        iterations[idx[zero]] = n
+        live = ~zero
+        idx = idx[live]
+        x[idx] = x_n[live] - fxn[live] / Dfxn[live]
+        iterations[idx] = n + 1
+    roots = mathx.where(status == CONVERGED, x, mathx.nan)
+    return (roots.reshape(shape), status.reshape(shape),
+            iterations.reshape(shape))
+
+
+if __name__ == '__main__':
+    print(root_newton_method(func,derivative,1.1,epsilon,N,full_output=True))
@@ -0,0 +1,36 @@
+'''
+Result object shared by the root finders in root_bisection.py and
+root_newton.py. The solvers return one of these when called with
+full_output=True.
+'''
+
+
+class RootResult(object):
+    """Outcome of a single root search.
+
+    Attributes:
+        root:        Best estimate of the root.
+        iterations:  Number of iterations performed.
+        evaluations: Number of calls to func (and derivative, if given).
+        residual:    abs(func(x)) at the last point the solver evaluated,
+                     or None if it never evaluated func.
+        converged:   True if the solver met its tolerance.
+        wall_time:   Seconds spent inside the solver.
+    """
+    __slots__ = ('root', 'iterations', 'evaluations', 'residual',
+                 'converged', 'wall_time')
+
+    def __init__(self, root, iterations, evaluations, residual, converged,
+                 wall_time):
+        self.root = root
+        self.iterations = iterations
+        self.evaluations = evaluations
+        self.residual = residual
+        self.converged = converged
+        self.wall_time = wall_time
+
+    def __repr__(self):
+        return ('RootResult(root=%r, iterations=%r, evaluations=%r, '
+                'residual=%r, converged=%r, wall_time=%r)'
+                % (self.root, self.iterations, self.evaluations,
+                   self.residual, self.converged, self.wall_time))
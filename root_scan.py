@@ -0,0 +1,97 @@
+'''
+Finds every root of a function on an interval, for example all roots of
+f(x) = exp(x) * ln(x) - x * x on [1, 10]:
+
+    >>> def f(x):
+    ...     return mathx.exp(x) * mathx.log(x) - x * x
+    >>> find_roots(f, 1, 10)
+
+The interval is sampled on a grid to find sign changes, and the brackets
+found are bisected in chunks, optionally across a process pool. A sign
+change can also be a pole, as for tan(x) at pi/2; bisection closes in on
+it just the same, so a point is kept as a root only if func is no larger
+there than at the ends of its bracket.
+'''
+
+import concurrent.futures
+import itertools
+import os
+
+import numpy as mathx
+
+from root_bisection import root_bisection_batch
+
+
+def find_brackets(func, start, end, samples=1001):
+    """Samples func on a grid and returns the brackets that hold a root.
+
+    Args:
+        func:    A vectorized function of one variable.
+        start:   Left end of the interval.
+        end:     Right end of the interval.
+        samples: Number of grid points. Two roots closer together than the
+                 grid spacing may be missed.
+    Returns:
+        A tuple (lower, higher, zeros): the ends of every grid cell whose
+        ends have opposite signs, and the grid points where func is exactly
+        zero. Points where func is nan or infinite are skipped.
+    """
+    xs = mathx.linspace(start, end, samples)
+    with mathx.errstate(invalid='ignore', divide='ignore', over='ignore'):
+        ys = mathx.asarray(func(xs), dtype=float)
+    signs = mathx.where(mathx.isfinite(ys), mathx.sign(ys), 0)
+    change = signs[:-1] * signs[1:] < 0
+    return xs[:-1][change], xs[1:][change], xs[ys == 0]
+
+
+def _solve_chunk(func, lower, higher, tolerance):
+    roots, converged, iterations = root_bisection_batch(func, lower, higher,
+                                                        tolerance)
+    # Near a pole |func| grows as the bracket shrinks; near a root it falls.
+    with mathx.errstate(invalid='ignore', divide='ignore', over='ignore'):
+        ends = mathx.maximum(abs(mathx.asarray(func(lower), dtype=float)),
+                             abs(mathx.asarray(func(higher), dtype=float)))
+        residuals = abs(mathx.asarray(func(roots), dtype=float))
+    return roots[converged & (residuals <= ends)]
+
+
+def find_roots(func, start, end, samples=1001, tolerance=1.0e-6,
+               workers=1, chunk_size=None):
+    """Finds all roots of func between start and end.
+
+    Args:
+        func:       A vectorized function of one variable. When more than
+                    one worker is used it must be picklable, i.e. defined
+                    at module level rather than as a lambda.
+        start:      Left end of the interval.
+        end:        Right end of the interval.
+        samples:    Number of grid points used to look for sign changes.
+        tolerance:  Bracket width at which each root counts as solved.
+        workers:    Number of worker processes. 1 (the default) solves
+                    everything in this process; None uses one per CPU. No
+                    more processes are started than there are chunks.
+        chunk_size: Number of brackets per work unit. By default the
+                    brackets are split into four units per worker.
+    Returns:
+        Sorted ndarray of the roots found. Sign changes where |func| at the
+        converged point is larger than at both ends of the bracket are
+        poles, not roots, and are left out.
+    """
+    lower, higher, zeros = find_brackets(func, start, end, samples)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if chunk_size is None:
+        chunk_size = max(1, -(-len(lower) // (4 * workers)))
+    starts = range(0, len(lower), chunk_size)
+    lowers = [lower[i:i + chunk_size] for i in starts]
+    highers = [higher[i:i + chunk_size] for i in starts]
+    if workers == 1 or len(lowers) <= 1:
+        results = list(map(_solve_chunk, itertools.repeat(func), lowers,
+                           highers, itertools.repeat(tolerance)))
+    else:
+        with concurrent.futures.ProcessPoolExecutor(
+                min(workers, len(lowers))) as pool:
+            results = list(pool.map(_solve_chunk, itertools.repeat(func),
+                                    lowers, highers,
+                                    itertools.repeat(tolerance)))
+    return mathx.sort(mathx.concatenate(results + [zeros]))
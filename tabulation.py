@@ -0,0 +1,171 @@
+'''
+Streaming function tables.
+
+tabulate() is the single engine behind the tab() family in appendix1.py.
+It lazily yields rows (x, f1(x), f2(x), ...), calling each function
+exactly once per input. The sinks below consume those rows:
+
+    write_text()  -- the "x. . .f(x)" layout printed by tab()
+    write_csv()   -- comma separated values
+    to_array()    -- a 2-D NumPy array, one row per input
+
+Both text sinks write in buffered blocks, so tables of millions of rows can
+be streamed straight into a file.
+
+Functions that work on NumPy arrays (most polynomials do) can be evaluated
+with one call on an arange instead of one call per input; see column().
+'''
+
+import csv
+import itertools
+import math
+import sys
+
+from instrument import instrument
+from lazy import lazy_import
+
+mathx = lazy_import('numpy')
+
+# Number of rows joined into one write() call by write_text().
+BLOCK_ROWS = 4096
+
+
+def tabulate(functions, start, end, step=1, vectorize=False):
+    """Yields the rows of a function table.
+
+    Args:
+        functions: A sequence of functions of one variable. Use
+                   functools.partial to fix any other arguments.
+        start:     Starting input.
+        end:       Last input (included when it falls on a step).
+        step:      Step size, as for range().
+        vectorize: If true, try evaluating each function once on an array
+                   of all the inputs (see column()).
+    Returns:
+        An iterator of tuples (x, f1(x), f2(x), ...).
+    """
+    xs = range(start, end + 1, step)
+    return zip(xs, *[column(instrument(f), xs, vectorize)
+                     for f in functions])
+
+
+def column(function, xs, vectorize=False):
+    """Returns the values of function over the range xs.
+
+    Args:
+        function:  A function of one variable.
+        xs:        A range of inputs.
+        vectorize: If true, call function once on mathx.arange(...) and use
+                   the result if it is an array of the right shape that
+                   agrees with the scalar function at the first and last
+                   input, and, for integer results, passes the overflow
+                   check in array_values(). Otherwise, or if the array call
+                   raises, fall back to calling function once per input.
+    Returns:
+        A list of values if the array call was used, else a lazy iterator.
+    """
+    if vectorize and len(xs) > 0:
+        values = array_values(function, xs)
+        if values is not None:
+            return values.tolist()
+    return map(function, xs)
+
+
+def array_values(function, xs):
+    """Calls function once on an array of the inputs in xs, a range or a
+    sequence of numbers.
+
+    The first and last values are checked against the scalar function,
+    which catches functions that only look vectorized. That cannot see an
+    int64 overflow in the middle of the range, so integer results are
+    also recomputed from float64 inputs: they are used only if the float
+    values stay below 2**63 in magnitude and agree with them.
+
+    Returns:
+        The resulting 1-D ndarray, or None if the call raised, did not
+        return an array of len(xs) values, disagreed with the scalar
+        function at the first or last input, or may have overflowed.
+    """
+    try:
+        with mathx.errstate(all='ignore'):
+            values = function(_array(xs))
+    except Exception:
+        return None
+    if not isinstance(values, mathx.ndarray) or values.shape != (len(xs),):
+        return None
+    for i in (0, -1):
+        got = values[i].item()
+        expected = function(xs[i])
+        if got != expected and not (
+                isinstance(expected, float) and
+                math.isclose(got, expected, rel_tol=1e-12)):
+            return None
+    if values.dtype.kind in 'iu' and not _fits_int64(function, xs, values):
+        return None
+    return values
+
+
+def _fits_int64(function, xs, values):
+    # Wrapped-around int64 values are nowhere near the float64 ones.
+    try:
+        with mathx.errstate(all='ignore'):
+            floats = function(_array(xs, mathx.float64))
+    except Exception:
+        return False
+    if not isinstance(floats, mathx.ndarray) or floats.shape != values.shape:
+        return False
+    return fits_int64(values, floats)
+
+
+def fits_int64(values, floats):
+    """Returns True if the integer array values agrees with floats, the
+    same values computed from float64 inputs, and they stay below 2**63 in
+    magnitude, so that none of values can have wrapped around."""
+    floats = floats.astype(mathx.float64, copy=False)
+    return bool(mathx.all(mathx.abs(floats) < 2.0 ** 63) and
+                mathx.allclose(values, floats, rtol=1e-6, atol=1))
+
+
+def _array(xs, dtype=None):
+    if isinstance(xs, range):
+        return mathx.arange(xs.start, xs.stop, xs.step, dtype=dtype)
+    return mathx.asarray(xs, dtype=dtype)
+
+
+def function_name(function):
+    """Returns the name tab() prints for a function."""
+    return getattr(function, '__name__', str(function))
+
+
+def write_text(rows, file=None, sep='. . .'):
+    """Writes rows as lines of sep-separated values."""
+    if file is None:
+        file = sys.stdout
+    join = sep.join
+    rows = iter(rows)
+    while True:
+        block = [join(map(str, row)) for row in
+                 itertools.islice(rows, BLOCK_ROWS)]
+        if not block:
+            break
+        block.append('')
+        file.write('\n'.join(block))
+
+
+def write_csv(rows, file, header=None):
+    """Writes rows to an open file as CSV, with an optional header row."""
+    writer = csv.writer(file)
+    if header is not None:
+        writer.writerow(header)
+    writer.writerows(rows)
+
+
+def to_array(rows, dtype=float):
+    """Collects rows into a 2-D ndarray with one row per input."""
+    rows = iter(rows)
+    try:
+        first = next(rows)
+    except StopIteration:
+        return mathx.empty((0, 0), dtype=dtype)
+    flat = itertools.chain(first, itertools.chain.from_iterable(rows))
+    return mathx.fromiter(flat, dtype=dtype).reshape(-1, len(first))